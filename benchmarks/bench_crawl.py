@@ -0,0 +1,39 @@
+"""Crawl throughput against a local stand-in site.
+
+    python -m benchmarks.bench_crawl --pages 300 --latency 0.02 --workers 1 8 16
+"""
+import argparse
+import tempfile
+
+from benchmarks.local_site import LocalSite, synthetic_pages
+from modules.web_scraper import WebScraper
+
+
+def make_config(base_url, output_dir, workers, rate_limit):
+    return {
+        "scraper": {
+            "base_domain": base_url,
+            "pages": {"urls": [], "max_pages": 10 ** 9},
+            "articles": {"urls": [], "max_articles": 0},
+            "output_dir": output_dir,
+            "concurrency": {"workers": workers, "rate_limit_per_host": rate_limit},
+        }
+    }
+
+
+def run(pages, latency, workers, rate_limit):
+    with LocalSite(synthetic_pages(pages), latency=latency) as site:
+        for count in workers:
+            with tempfile.TemporaryDirectory() as output_dir:
+                scraper = WebScraper(make_config(site.base_url, output_dir, count, rate_limit))
+                scraper.scrape_urls(site.urls(), "page", pages, f"workers={count}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated server latency in seconds")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 16])
+    parser.add_argument("--rate-limit", type=float, default=0, help="requests/sec per host, 0 disables")
+    args = parser.parse_args()
+    run(args.pages, args.latency, args.workers, args.rate_limit)
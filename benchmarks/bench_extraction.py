@@ -0,0 +1,78 @@
+"""HTML-to-text extraction throughput on the saved HTML fixtures.
+
+    python -m benchmarks.bench_extraction --repeat 200 --processes 4
+
+Compares the previous BeautifulSoup extraction ("before") with the single-pass
+extractor, in-process and on a process pool, and reports docs/sec for each.
+"""
+import argparse
+import glob
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bs4 import BeautifulSoup
+
+from modules.html_extractor import NOISY_PHRASES, extract_text
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def legacy_extract_text(html):
+    """The extraction WebScraper.scrape_page used before the single-pass extractor."""
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup.find_all(['header', 'footer', 'nav', 'button', 'a', 'form']):
+        element.decompose()
+    for element in soup.find_all(class_=['navbar', 'footer', 'menu', 'header', 'skip-to-content', 'profile-icon', 'consent', 'disclaimer']):
+        element.decompose()
+    for element in soup.find_all(id=['navbar', 'footer', 'menu', 'header']):
+        element.decompose()
+    content = []
+    main_content = soup.find(['main', 'article'])
+    for element in (main_content or soup).find_all(['p', 'h1', 'h2', 'h3', 'td', 'th']):
+        text = element.get_text(separator=" ", strip=True)
+        if text:
+            content.append(text)
+    cleaned_content = " ".join(content)
+    for phrase in NOISY_PHRASES:
+        cleaned_content = cleaned_content.lower().replace(phrase.lower(), "").strip()
+    cleaned_content = re.sub(r'\s+', ' ', cleaned_content).strip()
+    return cleaned_content if cleaned_content else None
+
+
+def load_fixtures():
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            fixtures.append(f.read())
+    return fixtures
+
+
+def measure(label, docs, run):
+    started = time.perf_counter()
+    run(docs)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {len(docs) / elapsed:>10.1f} docs/sec")
+
+
+def main(repeat, processes):
+    fixtures = load_fixtures()
+    docs = fixtures * repeat
+    print(f"{len(fixtures)} fixtures x {repeat} = {len(docs)} docs")
+    same = sum(legacy_extract_text(html) == extract_text(html) for html in fixtures)
+    print(f"identical output on {same}/{len(fixtures)} fixtures")
+    measure("before (BeautifulSoup)", docs, lambda d: [legacy_extract_text(html) for html in d])
+    measure("single-pass", docs, lambda d: [extract_text(html) for html in d])
+    if processes:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            list(pool.map(extract_text, fixtures))  # start the workers outside the timing
+            measure(f"single-pass, {processes} processes", docs, lambda d: list(pool.map(extract_text, d, chunksize=16)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    main(args.repeat, args.processes)
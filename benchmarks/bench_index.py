@@ -0,0 +1,73 @@
+"""Recall@k vs query latency of the vector store index types against the Flat baseline.
+
+    python -m benchmarks.bench_index --types flat ivf hnsw ivfpq sq8 sq16 --k 10
+    python -m benchmarks.bench_index --synthetic 200000 --dimension 384
+
+By default the corpus is the embeddings in `embeddings.output_dir` and index
+parameters come from `vector_store.index` in config.yml; --set overrides them,
+e.g. --set nprobe=32 ef_search=128.
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from modules.config_loader import load_config
+from modules.embedding_files import load_embeddings
+from modules.vector_store import create_index, index_settings
+
+
+def percentile_ms(latencies, q):
+    return float(np.percentile(latencies, q) * 1000)
+
+
+def evaluate(name, settings, vectors, queries, truth, k):
+    started = time.perf_counter()
+    index = create_index(settings, vectors)
+    build_seconds = time.perf_counter() - started
+    latencies = []
+    found = np.empty((len(queries), k), dtype=np.int64)
+    for i, query in enumerate(queries):
+        started = time.perf_counter()
+        _, found[i] = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - started)
+    recall = np.mean([len(set(found[i]) & set(truth[i])) / k for i in range(len(queries))])
+    size_mb = faiss.serialize_index(index).nbytes / 2 ** 20
+    print(f"{name:<10} recall@{k}={recall:.3f}  p50={percentile_ms(latencies, 50):.3f}ms  "
+          f"p99={percentile_ms(latencies, 99):.3f}ms  build={build_seconds:.1f}s  size={size_mb:.1f}MB")
+
+
+def main(args):
+    config = load_config(args.config)
+    if args.synthetic:
+        vectors = np.random.default_rng(0).standard_normal((args.synthetic, args.dimension)).astype(np.float32)
+    else:
+        _, vectors = load_embeddings(config["embeddings"]["output_dir"])
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    rng = np.random.default_rng(1)
+    # Queries are perturbed corpus vectors so they resemble real lookups without being exact hits
+    rows = rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)
+    queries = vectors[rows] + rng.standard_normal((len(rows), vectors.shape[1])).astype(np.float32) * vectors.std() * 0.1
+
+    base = index_settings(config)
+    for assignment in args.set:
+        key, value = assignment.split("=", 1)
+        base[key] = int(value)
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries")
+    flat = create_index(dict(base, type="flat"), vectors)
+    _, truth = flat.search(queries, args.k)
+    for index_type in args.types:
+        evaluate(index_type, dict(base, type=index_type), vectors, queries, truth, args.k)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config.yml")
+    parser.add_argument("--types", nargs="+", default=["flat", "ivf", "hnsw", "ivfpq", "sq8", "sq16"])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--synthetic", type=int, default=0, help="use N random vectors instead of the corpus")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--set", nargs="*", default=[], help="override index settings, e.g. nprobe=32")
+    main(parser.parse_args())
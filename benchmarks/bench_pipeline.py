@@ -0,0 +1,114 @@
+"""End-to-end ingestion time: the four scripts one after another vs the streaming pipeline.
+
+    python -m benchmarks.bench_pipeline --pages 300 --latency 0.02 --encode-delay 0.002
+
+Runs offline: SyntheticCorpus pages are served by a LocalSite and embeddings come from the
+HashingEncoder, so nothing is downloaded. Every run writes to its own temporary data
+directory using the chunking, dedup and index settings of --config. A third run stops the
+pipeline halfway and starts it again, to show that the resumed run neither refetches
+the pages nor re-encodes the chunks the first run had finished.
+"""
+import argparse
+import copy
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.corpus import SyntheticCorpus
+from benchmarks.local_site import LocalSite
+from benchmarks.stub_encoder import HashingEncoder
+from modules.chunker import Chunker
+from modules.config_loader import load_config
+from modules.embedding_generator import EmbeddingGenerator
+from modules.knowledgebase_builder import KnowledgeBaseBuilder
+from modules.pipeline import IngestionPipeline, PipelineAborted
+from modules.vector_store import VectorStore
+from modules.web_scraper import WebScraper
+
+
+def make_config(config, site, root, workers):
+    config = copy.deepcopy(config)
+    config["scraper"] = {
+        "base_domain": site.base_url,
+        "pages": {"urls": site.urls(), "max_pages": 10 ** 9},
+        "articles": {"urls": [], "max_articles": 0},
+        "output_dir": os.path.join(root, "raw"),
+        "manifest_path": os.path.join(root, "crawl_manifest.json"),
+        "delta_path": os.path.join(root, "crawl_delta.json"),
+        "concurrency": {"workers": workers, "rate_limit_per_host": 0},
+    }
+    config["knowledgebase"] = dict(config["knowledgebase"], output_dir=os.path.join(root, "knowledgebase"),
+                                   chunks_dir=os.path.join(root, "knowledgebase", "chunks"))
+    config["embeddings"] = dict(config["embeddings"], output_dir=os.path.join(root, "embeddings"))
+    config["vector_store"] = dict(config["vector_store"], output_dir=os.path.join(root, "vectorstore"))
+    config["pipeline"] = dict(config.get("pipeline", {}), checkpoint_dir=os.path.join(root, "pipeline"))
+    return config
+
+
+def sequential(config, encoder):
+    timings = {}
+    steps = [
+        ("scrape", lambda: WebScraper(config).scrape()),
+        ("knowledgebase", lambda: KnowledgeBaseBuilder(config).build()),
+        ("chunk", lambda: Chunker(config).build()),
+        ("embed", lambda: EmbeddingGenerator(config, encoder).generate()),
+        ("index", lambda: VectorStore(config).build()),
+    ]
+    for name, step in steps:
+        started = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+def interrupted(config, encoder, site, stop_after):
+    pipeline = IngestionPipeline(config, encoder)
+
+    def stop_halfway():
+        while not pipeline.failed.is_set():
+            if getattr(pipeline, "handled", 0) >= stop_after:
+                pipeline.stop()
+                return
+            time.sleep(0.01)
+
+    threading.Thread(target=stop_halfway, daemon=True).start()
+    try:
+        pipeline.run()
+    except PipelineAborted:
+        pass
+    requests_before = site.requests
+    resumed = IngestionPipeline(config, encoder)
+    stats = resumed.run()
+    return site.requests - requests_before, stats
+
+
+def main(args):
+    config = load_config(args.config)
+    encoder = HashingEncoder(delay=args.encode_delay)
+    with LocalSite(SyntheticCorpus(args.pages).pages(), latency=args.latency) as site:
+        with tempfile.TemporaryDirectory() as root:
+            started = time.perf_counter()
+            timings = sequential(make_config(config, site, root, args.workers), encoder)
+            sequential_seconds = time.perf_counter() - started
+        with tempfile.TemporaryDirectory() as root:
+            stats = IngestionPipeline(make_config(config, site, root, args.workers), encoder).run()
+        with tempfile.TemporaryDirectory() as root:
+            requests, resumed = interrupted(make_config(config, site, root, args.workers), encoder, site, args.pages // 2)
+
+    print()
+    print(f"sequential scripts  {sequential_seconds:6.1f}s  "
+          + "  ".join(f"{name}={seconds:.1f}s" for name, seconds in timings.items()))
+    print(f"streaming pipeline  {stats['seconds']:6.1f}s  ({stats['documents']} documents, {stats['chunks']} chunks)")
+    print(f"resumed pipeline    {resumed['seconds']:6.1f}s  {requests} pages refetched, "
+          f"{resumed['encoded']} of {resumed['chunks']} chunks encoded")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config.yml")
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated server latency in seconds")
+    parser.add_argument("--workers", type=int, default=8, help="fetch threads")
+    parser.add_argument("--encode-delay", type=float, default=0.002, help="simulated model time per chunk in seconds")
+    main(parser.parse_args())
@@ -0,0 +1,90 @@
+"""Hit rate and latency of the retrieval stage: legacy keyword filter vs BM25 vs hybrid.
+
+    python -m benchmarks.bench_retrieval --queries 300 --k 3
+
+Runs against the published vector store and chunk store from config.yml. Each query is
+built from a random chunk: a question wrapped around a few of its rarest terms. A query
+is a hit when a chunk of the same parent document is in the top k results.
+"""
+import argparse
+import time
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from modules.bm25 import reciprocal_rank_fusion, tokenize
+from modules.config_loader import load_config
+from modules.vector_store import VectorStore
+
+QUESTION_TEMPLATES = ["what is the {}", "tell me about {}", "how do i get {}", "{}"]
+
+
+def make_queries(store, bm25, count, terms, rng):
+    ids = list(store.ids())
+    queries = []
+    for row in rng.choice(len(ids), min(count, len(ids)), replace=False):
+        chunk = store.get(ids[row])
+        # Rarest terms first: those are what a user asking about this page would type
+        candidates = sorted(set(tokenize(chunk["content"])), key=lambda term: len(bm25.postings.get(term, ())))
+        if not candidates:
+            continue
+        template = QUESTION_TEMPLATES[row % len(QUESTION_TEMPLATES)]
+        queries.append((template.format(" ".join(candidates[:terms])), chunk["doc_id"]))
+    return queries
+
+
+def legacy_filter(vector_store, store, embedding, query, search_k, k):
+    """The previous retrieve(): dense results kept if any query word is a substring of the chunk."""
+    keywords = query.lower().split()
+    results = []
+    for doc_id, distance in vector_store.search(embedding, search_k):
+        if distance > 1.0:
+            continue
+        content = store.get(doc_id)["content"].lower()
+        if any(keyword in content for keyword in keywords):
+            results.append(doc_id)
+    return results[:k]
+
+
+def bm25_only(vector_store, store, embedding, query, search_k, k):
+    return [doc_id for doc_id, _ in vector_store.search_lexical(query, k)]
+
+
+def hybrid(vector_store, store, embedding, query, search_k, k, rrf_k=60):
+    dense = [(doc_id, distance) for doc_id, distance in vector_store.search(embedding, search_k) if distance <= 1.0]
+    lexical = vector_store.search_lexical(query, search_k)
+    return [doc_id for doc_id, _ in reciprocal_rank_fusion([dense, lexical], rrf_k)[:k]]
+
+
+def evaluate(name, retriever, vector_store, store, model, queries, k):
+    latencies = []
+    hits = 0
+    for query, expected in queries:
+        started = time.perf_counter()
+        embedding = model.encode([query], show_progress_bar=False) if retriever is not bm25_only else None
+        results = retriever(vector_store, store, embedding, query, k * 2, k)
+        latencies.append(time.perf_counter() - started)
+        hits += any(store.get(doc_id)["doc_id"] == expected for doc_id in results)
+    print(f"{name:<8} hit@{k}={hits / len(queries):.3f}  p50={np.percentile(latencies, 50) * 1000:.2f}ms  "
+          f"p99={np.percentile(latencies, 99) * 1000:.2f}ms")
+
+
+def main(args):
+    config = load_config(args.config)
+    vector_store = VectorStore(config)
+    vector_store.load()
+    store = vector_store.chunk_store.load()
+    model = SentenceTransformer(config["embeddings"]["model"])
+    queries = make_queries(store, vector_store.bm25, args.queries, args.terms, np.random.default_rng(0))
+    print(f"{len(store)} chunks, {len(queries)} queries")
+    for name, retriever in [("legacy", legacy_filter), ("bm25", bm25_only), ("hybrid", hybrid)]:
+        evaluate(name, retriever, vector_store, store, model, queries, args.k)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config.yml")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--terms", type=int, default=3, help="rare chunk terms per query")
+    parser.add_argument("--k", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,90 @@
+"""Total memory of N serving workers holding the published index, memory-mapped vs loaded.
+
+    python -m benchmarks.bench_workers --workers 1 2 4 8
+
+Each worker is a separate process that opens the read-only VectorStore and the chunk
+DocumentIndex the way flask_api.py workers do, runs searches and reads every chunk so
+the pages are resident, then reports its proportional set size (PSS, from
+/proc/self/smaps_rollup, so Linux only). Shared pages are split between the processes
+that map them, so the sum of PSS is the real footprint of the group. The "index" column
+subtracts each worker's PSS measured after imports only.
+"""
+import argparse
+import copy
+import multiprocessing
+import queue
+
+import numpy as np
+
+from modules.config_loader import load_config
+
+
+def pss_mb():
+    with open("/proc/self/smaps_rollup", "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def worker(config, queries, results, measured):
+    from modules.document_store import DocumentIndex, DocumentStore
+    from modules.vector_store import VectorStore
+
+    baseline = pss_mb()
+    vector_store = VectorStore(config, read_only=True)
+    vector_store.ensure_loaded()
+    documents = DocumentIndex(DocumentStore.chunks_from_config(config)).load()
+    dimension = vector_store.index.d
+    rng = np.random.default_rng(0)
+    for query in queries:
+        vector_store.search(rng.standard_normal((1, dimension)).astype(np.float32), 10)
+        vector_store.search_lexical(query, 10)
+    for doc_id in documents.ids:
+        documents.get(str(doc_id))
+    results.put((baseline, pss_mb()))
+    # Stay alive until every worker has measured, so they all map the files at once
+    measured.wait()
+
+
+def run(config, workers, queries):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    measured = context.Event()
+    processes = [context.Process(target=worker, args=(config, queries, results, measured)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    samples = []
+    while len(samples) < workers:
+        try:
+            samples.append(results.get(timeout=1))
+        except queue.Empty:
+            if any(process.exitcode not in (None, 0) for process in processes):
+                measured.set()
+                raise RuntimeError("A worker process failed")
+    measured.set()
+    for process in processes:
+        process.join()
+    total = sum(after for _, after in samples)
+    index = sum(after - baseline for baseline, after in samples)
+    return total, index
+
+
+def main(args):
+    config = load_config(args.config)
+    queries = ["interest rate fixed deposit", "documents gold loan", "two wheeler loan tenure", "insurance plans"]
+    for mmap in (True, False):
+        run_config = copy.deepcopy(config)
+        run_config["vector_store"]["mmap"] = mmap
+        label = "mmap" if mmap else "in-memory"
+        for workers in args.workers:
+            total, index = run(run_config, workers, queries)
+            print(f"{label:<10} workers={workers:<3} total PSS={total:8.1f}MB  index={index:8.1f}MB  "
+                  f"index per worker={index / workers:7.1f}MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config.yml")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    main(parser.parse_args())
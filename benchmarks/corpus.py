@@ -0,0 +1,109 @@
+"""Deterministic synthetic corpora of any size for the offline benchmarks.
+
+Documents are generated from their number on demand, so a 1M-document corpus takes no
+memory until it is read, and the same seed always yields the same text. Words come from
+a made-up vocabulary with a Zipf-like frequency curve, and every document also draws
+heavily on the words of one of `topics` topics and carries a product code of its own,
+which gives retrieval something real to find. Queries are built from a document's code
+and topic words, so a benchmark knows which document each query should return.
+"""
+from collections.abc import Mapping
+
+import numpy as np
+
+from benchmarks.local_site import PAGE_TEMPLATE
+
+SYLLABLES = ("ka", "lo", "mi", "ren", "ta", "vo", "sha", "dun", "pe", "ri", "gal", "mo", "ne", "sor",
+             "ti", "bra", "cu", "den", "fi", "ho", "jas", "ku", "lem", "nor", "pa", "quin", "sel", "tu")
+QUESTION_TEMPLATES = ("what is {}", "tell me about {}", "how do i apply for {}", "{} eligibility", "{}")
+
+
+class SyntheticCorpus:
+    def __init__(self, size, seed=0, vocabulary=20000, topics=200, topic_words=40, words=(120, 400)):
+        self.size = size
+        self.seed = seed
+        self.words_per_document = words
+        rng = np.random.default_rng(seed)
+        vocabulary_words = set()
+        while len(vocabulary_words) < vocabulary:
+            count = int(rng.integers(2, 5))
+            vocabulary_words.add("".join(SYLLABLES[n] for n in rng.integers(0, len(SYLLABLES), count)))
+        self.vocabulary = np.array(sorted(vocabulary_words))
+        rng.shuffle(self.vocabulary)
+        # Zipf-like frequencies: word n is drawn about 1 / (n + 1) as often as the first
+        weights = 1.0 / np.arange(1, vocabulary + 1) ** 1.05
+        self.cumulative = np.cumsum(weights / weights.sum())
+        # Topic words come from the rarer half, so they discriminate between topics
+        self.topics = [rng.choice(self.vocabulary[vocabulary // 2:], topic_words, replace=False) for _ in range(topics)]
+
+    def _rng(self, i):
+        return np.random.default_rng([self.seed, i])
+
+    def topic(self, i):
+        return (i * 7919) % len(self.topics)
+
+    def code(self, i):
+        return f"plan{i}"
+
+    def document(self, i):
+        """{"id", "title", "paragraphs"} of document `i`."""
+        rng = self._rng(i)
+        topic_words = self.topics[self.topic(i)]
+        total = int(rng.integers(*self.words_per_document))
+        background = self.vocabulary[np.searchsorted(self.cumulative, rng.random(total))]
+        from_topic = rng.random(total) < 0.3
+        words = np.where(from_topic, topic_words[rng.integers(0, len(topic_words), total)], background).tolist()
+        # The code appears a few times, as a product name would
+        for position in rng.integers(0, total, 3):
+            words[position] = self.code(i)
+        paragraphs = []
+        start = 0
+        while start < total:
+            end = min(total, start + int(rng.integers(40, 120)))
+            paragraphs.append(" ".join(words[start:end]).capitalize() + ".")
+            start = end
+        title = f"{self.code(i).capitalize()} {topic_words[0]} {topic_words[1]}"
+        return {"id": f"doc-{i}", "title": title, "paragraphs": paragraphs}
+
+    def text(self, i):
+        document = self.document(i)
+        return "\n\n".join([document["title"]] + document["paragraphs"])
+
+    def html(self, i):
+        document = self.document(i)
+        paragraphs = "\n".join(f"<p>{paragraph}</p>" for paragraph in document["paragraphs"])
+        return PAGE_TEMPLATE.format(title=document["title"], paragraphs=paragraphs, rate=f"{5 + i % 5}.{i % 100:02d}")
+
+    def queries(self, count, seed=1):
+        """[(query, document id)] for `count` random documents."""
+        rng = np.random.default_rng([self.seed, seed])
+        queries = []
+        for i in rng.choice(self.size, min(count, self.size), replace=False).tolist():
+            topic_words = self.topics[self.topic(i)]
+            terms = [self.code(i)] + rng.choice(topic_words, 2, replace=False).tolist()
+            template = QUESTION_TEMPLATES[i % len(QUESTION_TEMPLATES)]
+            queries.append((template.format(" ".join(terms)), f"doc-{i}"))
+        return queries
+
+    def pages(self):
+        return SyntheticPages(self)
+
+
+class SyntheticPages(Mapping):
+    """path -> HTML view of a corpus for LocalSite; pages are rendered when requested."""
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+
+    def __getitem__(self, path):
+        if path.startswith("/doc-"):
+            number = path[len("/doc-"):]
+            if number.isdigit() and int(number) < self.corpus.size:
+                return self.corpus.html(int(number))
+        raise KeyError(path)
+
+    def __iter__(self):
+        return (f"/doc-{i}" for i in range(self.corpus.size))
+
+    def __len__(self):
+        return self.corpus.size
@@ -0,0 +1,118 @@
+"""Throughput and p50/p99 latency of query encoding + FAISS search with micro-batching on and off.
+
+    python -m benchmarks.load_test --clients 16 --requests 2000
+    python -m benchmarks.load_test --url http://localhost:5000/chat --clients 16 --requests 500
+
+In-process mode (the default) runs `DenseSearch` from modules/batcher.py against the
+published vector store, once without batching and once per --batch-sizes entry. Queries
+are the opening words of random chunks. With --url it POSTs the same queries to a running
+/chat endpoint instead; batching is then whatever that server's config.yml says.
+"""
+import argparse
+import copy
+import threading
+import time
+
+import numpy as np
+
+from modules.config_loader import load_config
+from modules.document_store import DocumentStore
+
+
+def sample_queries(config, count, words=8):
+    store = DocumentStore.chunks_from_config(config).load()
+    ids = list(store.ids())
+    rng = np.random.default_rng(0)
+    return [" ".join(store.get(ids[row])["content"].split()[:words])
+            for row in rng.choice(len(ids), min(count, len(ids)), replace=False)]
+
+
+def run_load(name, handle, queries, clients, total):
+    latencies = []
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def client():
+        local = []
+        while True:
+            with lock:
+                n = next(counter, None)
+            if n is None:
+                break
+            started = time.perf_counter()
+            handle(queries[n % len(queries)])
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    print(f"{name:<22} {total / elapsed:8.1f} req/s  p50={np.percentile(latencies, 50) * 1000:.1f}ms  "
+          f"p99={np.percentile(latencies, 99) * 1000:.1f}ms")
+
+
+def in_process(args, config, queries):
+    from modules.batcher import DenseSearch
+
+    runs = [("batching off", {"enabled": False})]
+    for size in args.batch_sizes:
+        runs.append((f"batching on (max {size})",
+                     {"enabled": True, "max_batch_size": size, "max_wait_ms": args.max_wait_ms}))
+    for name, batching in runs:
+        run_config = copy.deepcopy(config)
+        run_config.setdefault("serving", {})["batching"] = batching
+        dense = DenseSearch(run_config)
+
+        def handle(query):
+            dense.search(dense.encode(query), args.k)
+
+        # Warm up the model and index before timing
+        for query in queries[:args.clients]:
+            handle(query)
+        run_load(name, handle, queries, args.clients, args.requests)
+        stats = dense.stats()
+        if stats["enabled"]:
+            print(f"{'':<22} mean encode batch={stats['encode']['mean_batch_size']:.1f}  "
+                  f"mean search batch={stats['search']['mean_batch_size']:.1f}")
+        dense.close()
+
+
+def over_http(args, queries):
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=args.clients)
+    session.mount("http://", adapter)
+
+    def handle(query):
+        session.post(args.url, json={"query": query}, timeout=60).raise_for_status()
+
+    run_load(args.url, handle, queries, args.clients, args.requests)
+
+
+def main(args):
+    config = load_config(args.config)
+    queries = sample_queries(config, args.queries)
+    print(f"{len(queries)} distinct queries, {args.clients} concurrent clients, {args.requests} requests")
+    if args.url:
+        over_http(args, queries)
+    else:
+        in_process(args, config, queries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config.yml")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=500, help="distinct queries sampled from the chunks")
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    parser.add_argument("--url", help="load-test a running /chat endpoint instead")
+    main(parser.parse_args())
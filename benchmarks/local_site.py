@@ -0,0 +1,136 @@
+import gzip
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE_TEMPLATE = """<html>
+<head><title>{title}</title></head>
+<body>
+<header><nav class="navbar"><a href="/">Home</a><a href="/products">Products</a></nav></header>
+<main>
+<h1>{title}</h1>
+{paragraphs}
+<table><tr><th>Tenure</th><th>Rate</th></tr><tr><td>12 months</td><td>{rate}% p.a.</td></tr></table>
+<button>Apply Online</button>
+</main>
+<footer class="footer"><p>The common man's partner in prosperity</p></footer>
+</body>
+</html>"""
+
+WORDS = (
+    "loan deposit gold vehicle tenure interest rate savings investment plan customer branch "
+    "document proof identity address income monthly scheme finance insurance repayment"
+).split()
+
+
+def synthetic_page(i, paragraphs=5):
+    """Deterministic HTML page for page number `i`."""
+    body = []
+    for p in range(paragraphs):
+        words = [WORDS[(i * 7 + p * 3 + w) % len(WORDS)] for w in range(40)]
+        body.append(f"<p>Page {i} section {p}: {' '.join(words)}.</p>")
+    return PAGE_TEMPLATE.format(title=f"Product {i}", paragraphs="\n".join(body), rate=f"{5 + i % 5}.{i % 100:02d}")
+
+
+def synthetic_pages(count, paragraphs=5):
+    return {f"/page-{i}": synthetic_page(i, paragraphs) for i in range(count)}
+
+
+def add_sitemaps(site, per_sitemap=1000, compress=True):
+    """Publish a /sitemap.xml index pointing at (optionally gzipped) sitemaps of the site's pages.
+
+    Must be called after the site is entered so urls carry the real port. Returns the index url.
+    """
+    urls = site.urls()
+    children = []
+    for n, start in enumerate(range(0, len(urls), per_sitemap)):
+        entries = "".join(f"<url><loc>{url}</loc></url>" for url in urls[start:start + per_sitemap])
+        body = ('<?xml version="1.0" encoding="UTF-8"?>'
+                f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>').encode("utf-8")
+        path = f"/sitemap-{n}.xml.gz" if compress else f"/sitemap-{n}.xml"
+        site.pages[path] = gzip.compress(body) if compress else body
+        children.append(site.base_url + path)
+    entries = "".join(f"<sitemap><loc>{url}</loc></sitemap>" for url in children)
+    site.pages["/sitemap.xml"] = ('<?xml version="1.0" encoding="UTF-8"?>'
+                                  f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>')
+    return site.base_url + "/sitemap.xml"
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that stop reading early (e.g. an abandoned sitemap stream) reset the connection
+        pass
+
+
+class LocalSite:
+    """Serves a dict of path -> body on localhost so the crawler can be exercised offline.
+
+    Use as a context manager; `base_url` is available once entered. `latency` adds a fixed
+    delay per response to imitate a remote server. Responses carry an ETag and honour
+    If-None-Match, so conditional re-crawls can be exercised too.
+    """
+
+    def __init__(self, pages, latency=0.0):
+        self.pages = pages
+        self.latency = latency
+        self.requests = 0
+        self.server = None
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def urls(self):
+        return [self.base_url + path for path in self.pages if not path.endswith((".xml", ".gz"))]
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                site.requests += 1
+                if site.latency:
+                    time.sleep(site.latency)
+                body = site.pages.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if isinstance(body, str):
+                    body = body.encode("utf-8")
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self.server = _QuietServer(("127.0.0.1", 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
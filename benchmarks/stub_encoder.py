@@ -0,0 +1,38 @@
+import re
+import time
+import zlib
+
+import numpy as np
+
+
+class HashingEncoder:
+    """Stand-in for the SentenceTransformer that needs no model download.
+
+    Each lowercased word is hashed (crc32, so vectors are the same across runs) to one of
+    `dimension` signed buckets and the counts are L2-normalized, so texts sharing words get
+    close vectors. `delay` adds seconds per encoded text to imitate the cost of a real model.
+    """
+
+    TOKEN_PATTERN = re.compile(r"\w+")
+
+    def __init__(self, dimension=384, delay=0.0):
+        self.dimension = dimension
+        self.delay = delay
+        self.buckets = {}   # token -> (bucket, sign)
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, texts, batch_size=None, show_progress_bar=False):
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in self.TOKEN_PATTERN.findall(text.lower()):
+                bucket = self.buckets.get(token)
+                if bucket is None:
+                    code = zlib.crc32(token.encode("utf-8"))
+                    bucket = self.buckets[token] = (code % self.dimension, 1.0 if code & 0x80000000 else -1.0)
+                vectors[row, bucket[0]] += bucket[1]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        if self.delay:
+            time.sleep(self.delay * len(texts))
+        return vectors / np.maximum(norms, 1e-12)
@@ -0,0 +1,294 @@
+"""Offline benchmark suite: scrape/parse rate, ingest and embedding throughput, index build
+time and memory, and per-stage query latency, written as JSON so runs can be compared.
+
+    python -m benchmarks.suite --docs 1000 10000 --index-types flat hnsw
+    python -m benchmarks.suite --compare benchmarks/results/before.json benchmarks/results/after.json
+
+For every --docs size a SyntheticCorpus is generated (see benchmarks/corpus.py) and the
+whole flow runs in a temporary data directory with the rest of the settings from --config:
+
+- parse: extract_text over the corpus HTML
+- scrape: WebScraper fetching, parsing and saving pages from a LocalSite serving the corpus
+- ingest: writing the documents to the knowledgebase store, then chunking them
+- embed: EmbeddingGenerator over all chunks, with the HashingEncoder unless --model names
+  a real sentence-transformers model
+- per --index-types entry, build: VectorStore.build time, peak and retained memory, size
+  on disk; and query: RAGModel.retrieve latency per stage (the spans of
+  modules/metrics.py) and overall, with the query caches off, plus hit rate at top_k
+
+Memory figures read /proc/self, so they are Linux only. Results go to --output (by default
+benchmarks/results/suite-<time>.json).
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.corpus import SyntheticCorpus
+from benchmarks.local_site import LocalSite
+from benchmarks.stub_encoder import HashingEncoder
+from modules.chunker import Chunker
+from modules.config_loader import load_config
+from modules.document_store import DocumentStore
+from modules.embedding_generator import EmbeddingGenerator
+from modules.html_extractor import extract_text
+from modules.metrics import trace
+from modules.registry import default_registry
+from modules.vector_store import VectorStore
+from modules.web_scraper import WebScraper
+
+
+def rss_mb():
+    with open("/proc/self/statm", "r", encoding="utf-8") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+class PeakMemory:
+    """Samples the process RSS in a background thread while the block runs."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.done = threading.Event()
+
+    def _sample(self):
+        while not self.done.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        self.before = self.peak = rss_mb()
+        self.thread = threading.Thread(target=self._sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.done.set()
+        self.thread.join()
+        self.after = rss_mb()
+        self.peak = max(self.peak, self.after)
+
+    def stats(self):
+        return {"peak_mb": self.peak - self.before, "retained_mb": self.after - self.before}
+
+
+def latency(samples):
+    samples = np.asarray(samples) * 1000
+    return {"count": len(samples), "mean_ms": float(samples.mean()), "p50_ms": float(np.percentile(samples, 50)),
+            "p99_ms": float(np.percentile(samples, 99))}
+
+
+def directory_mb(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names) / 2 ** 20
+
+
+def make_config(config, root, args):
+    config = copy.deepcopy(config)
+    config["scraper"] = dict(config["scraper"], output_dir=os.path.join(root, "raw"),
+                             manifest_path=os.path.join(root, "crawl_manifest.json"),
+                             delta_path=os.path.join(root, "crawl_delta.json"),
+                             concurrency={"workers": args.workers, "rate_limit_per_host": 0})
+    config["knowledgebase"] = dict(config["knowledgebase"], output_dir=os.path.join(root, "knowledgebase"),
+                                   chunks_dir=os.path.join(root, "knowledgebase", "chunks"))
+    config["embeddings"] = dict(config["embeddings"], output_dir=os.path.join(root, "embeddings"))
+    if args.model:
+        config["embeddings"]["model"] = args.model
+    # Every query is new to the caches anyway; turning them off keeps warm-up queries from counting
+    config["cache"] = {"embedding_size": 0, "retrieval_size": 0, "answer_size": 0}
+    return config
+
+
+def bench_parse(corpus, pages):
+    count = min(pages, corpus.size)
+    pages = [corpus.html(i) for i in range(count)]
+    started = time.perf_counter()
+    for html in pages:
+        extract_text(html)
+    elapsed = time.perf_counter() - started
+    return {"pages": count, "seconds": elapsed, "pages_per_second": count / elapsed}
+
+
+def bench_scrape(corpus, config, pages, latency_seconds):
+    count = min(pages, corpus.size)
+    with LocalSite(corpus.pages(), latency=latency_seconds) as site:
+        config = dict(config, scraper=dict(config["scraper"], base_domain=site.base_url))
+        scraper = WebScraper(config)
+        urls = [f"{site.base_url}/doc-{i}" for i in range(count)]
+        started = time.perf_counter()
+        scraper.scrape_urls(urls, "page", count, "Scraping")
+        elapsed = time.perf_counter() - started
+    return {"pages": count, "seconds": elapsed, "pages_per_second": count / elapsed,
+            "saved": len(os.listdir(config["scraper"]["output_dir"]))}
+
+
+def bench_ingest(corpus, config):
+    store = DocumentStore.from_config(config)
+    started = time.perf_counter()
+    with store.writer() as writer:
+        for i in range(corpus.size):
+            writer.add({"id": f"doc-{i}", "content": corpus.text(i)})
+    written = time.perf_counter() - started
+    started = time.perf_counter()
+    chunks = len(Chunker(config).build())
+    chunked = time.perf_counter() - started
+    return {"documents": corpus.size, "write_seconds": written, "documents_per_second": corpus.size / written,
+            "chunks": chunks, "chunk_seconds": chunked, "chunks_per_second": chunks / chunked}
+
+
+def bench_embed(config, encoder):
+    generator = EmbeddingGenerator(config, encoder)
+    started = time.perf_counter()
+    ids, vectors = generator.generate()
+    elapsed = time.perf_counter() - started
+    return {"chunks": len(ids), "dimension": int(vectors.shape[1]), "seconds": elapsed,
+            "chunks_per_second": len(ids) / elapsed}
+
+
+def bench_build(config):
+    with PeakMemory() as memory:
+        started = time.perf_counter()
+        store = VectorStore(config)
+        store.build()
+        elapsed = time.perf_counter() - started
+    version_dir = os.path.join(store.versions_dir, store.version)
+    stats = {"seconds": elapsed, "disk_mb": directory_mb(version_dir)}
+    stats.update(memory.stats())
+    return stats
+
+
+def bench_query(config, queries):
+    from modules.rag_model import RAGModel
+
+    rag = RAGModel(config)
+    rag.warm_up(llm=False)
+    stages, totals, hits = {}, [], 0
+    for query, doc_id in queries:
+        with trace() as spans:
+            started = time.perf_counter()
+            retrieved = rag.retrieve(query)
+            totals.append(time.perf_counter() - started)
+        for stage, seconds in spans:
+            stages.setdefault(stage, []).append(seconds)
+        hits += any(doc["doc_id"] == doc_id for doc in retrieved)
+    stats = {stage: latency(samples) for stage, samples in stages.items()}
+    stats["retrieve"] = latency(totals)
+    stats["hit_rate"] = hits / len(queries)
+    return stats
+
+
+def run_size(config, size, args, encoder):
+    corpus = SyntheticCorpus(size, seed=args.seed)
+    result = {"docs": size}
+    with tempfile.TemporaryDirectory() as root:
+        run_config = make_config(config, root, args)
+        print(f"[{size} docs] parse")
+        result["parse"] = bench_parse(corpus, args.parse_pages)
+        print(f"[{size} docs] scrape")
+        result["scrape"] = bench_scrape(corpus, run_config, args.scrape_pages, args.latency)
+        print(f"[{size} docs] ingest")
+        result["ingest"] = bench_ingest(corpus, run_config)
+        print(f"[{size} docs] embed")
+        result["embed"] = bench_embed(run_config, encoder)
+        queries = corpus.queries(args.queries)
+        result["indexes"] = {}
+        for index_type in args.index_types:
+            index_config = copy.deepcopy(run_config)
+            index_config["vector_store"] = dict(index_config["vector_store"],
+                                                output_dir=os.path.join(root, "vectorstore", index_type),
+                                                index=dict(index_config["vector_store"].get("index", {}), type=index_type))
+            print(f"[{size} docs] {index_type}: build")
+            build = bench_build(index_config)
+            print(f"[{size} docs] {index_type}: query")
+            result["indexes"][index_type] = {"build": build, "query": bench_query(index_config, queries)}
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(value, prefix=""):
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(flatten(item, f"{prefix}/{key}" if prefix else str(key)))
+        return flat
+    return {prefix: value} if isinstance(value, (int, float)) and not isinstance(value, bool) else {}
+
+
+def compare(before_path, after_path):
+    """Print every numeric result present in both files with its relative change."""
+    results = []
+    for path in (before_path, after_path):
+        with open(path, "r", encoding="utf-8") as f:
+            runs = json.load(f)["runs"]
+        results.append(flatten({f"docs={run['docs']}": run for run in runs}))
+    before, after = results
+    for key in sorted(set(before) & set(after)):
+        change = (after[key] - before[key]) / before[key] if before[key] else 0.0
+        print(f"{key:<60} {before[key]:>12.4g} {after[key]:>12.4g} {change:>+8.1%}")
+
+
+def main(args):
+    if args.compare:
+        compare(*args.compare)
+        return
+    config = load_config(args.config)
+    encoder = None
+    if not args.model:
+        # The retrieval path gets its encoder from the registry; hand it the stand-in
+        encoder = HashingEncoder(dimension=args.dimension)
+        default_registry.get(f"sentence_transformer:{config['embeddings']['model']}", lambda: encoder)
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "encoder": args.model or f"hashing-{args.dimension}",
+            "args": vars(args),
+        },
+        "runs": [run_size(config, size, args, encoder) for size in args.docs],
+    }
+    output = args.output or os.path.join("benchmarks", "results", f"suite-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    for run in report["runs"]:
+        print(f"{run['docs']} docs: parse {run['parse']['pages_per_second']:.0f} pages/s, "
+              f"scrape {run['scrape']['pages_per_second']:.0f} pages/s, "
+              f"ingest {run['ingest']['documents_per_second']:.0f} docs/s, "
+              f"embed {run['embed']['chunks_per_second']:.0f} chunks/s")
+        for index_type, stats in run["indexes"].items():
+            query = stats["query"]
+            print(f"  {index_type:<8} build {stats['build']['seconds']:.2f}s (peak +{stats['build']['peak_mb']:.0f}MB)  "
+                  f"retrieve p50={query['retrieve']['p50_ms']:.2f}ms p99={query['retrieve']['p99_ms']:.2f}ms  "
+                  f"hit rate={query['hit_rate']:.2f}")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config.yml")
+    parser.add_argument("--docs", type=int, nargs="+", default=[1000, 10000], help="corpus sizes, up to 1M")
+    parser.add_argument("--index-types", nargs="+", default=["flat", "hnsw"])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--parse-pages", type=int, default=1000, help="pages parsed for the parse rate")
+    parser.add_argument("--scrape-pages", type=int, default=500, help="pages crawled from the local site")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated server latency in seconds")
+    parser.add_argument("--workers", type=int, default=8, help="crawler threads")
+    parser.add_argument("--model", help="a sentence-transformers model instead of the hashing encoder")
+    parser.add_argument("--dimension", type=int, default=384, help="hashing encoder dimension")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON results file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two results files")
+    main(parser.parse_args())
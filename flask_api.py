@@ -1,12 +1,37 @@
-from flask import Flask, request, jsonify
+import json
+import logging
+import threading
+import time
+from flask import Flask, Response, request, jsonify, stream_with_context
 from modules.chatbot import Chatbot
 from modules.config_loader import load_config
+from modules.metrics import RequestMonitor, configure_logging, default_metrics
+from modules.registry import default_registry, loaded_summary_generator
 
 app = Flask(__name__)
+logger = logging.getLogger("flask_api")
 
-# Initialize chatbot
+# Initialize chatbot; models and indexes load on first use, or in the background warm-up below
 config = load_config()
+configure_logging(config)
 chatbot = Chatbot(config)
+# Request counts and latency for /metrics; slow requests are logged (and optionally profiled)
+monitor = RequestMonitor(config)
+warmup = {"ready": False, "seconds": None, "error": None}
+
+def warm_up():
+    started = time.perf_counter()
+    try:
+        chatbot.rag_model.warm_up(llm=config.get("serving", {}).get("warmup_llm", True))
+        warmup["ready"] = True
+    except Exception as e:
+        warmup["error"] = str(e)
+        logger.error("Warm-up failed: %s", e)
+    warmup["seconds"] = time.perf_counter() - started
+    logger.info("Warm-up finished in %.2fs: %s", warmup["seconds"], default_registry.stats())
+
+if config.get("serving", {}).get("warmup", True):
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
 
 @app.route("/chat", methods=["POST"])
 def chat():
@@ -15,26 +40,82 @@ def chat():
         return jsonify({"error": "Missing 'query' in request body"}), 400
     
     query = data["query"]
-    session_id = data.get("session_id", "default")  # Optional: For tracking user sessions
+    session_id = data.get("session_id", "default")  # Optional: each session keeps its own history
 
     # Process query
-    try:
-        response = chatbot.process_query(query)
-        return jsonify({"response": response, "session_id": session_id})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    with monitor.request("chat") as record:
+        try:
+            response = chatbot.process_query(query, session_id)
+            return jsonify({"response": response, "session_id": session_id})
+        except Exception as e:
+            logger.exception("Error processing query")
+            record["status"] = "error"
+            return jsonify({"error": str(e)}), 500
+
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    """Server-sent events: one `data: {"text": ...}` event per piece, then `event: done`."""
+    data = request.get_json()
+    if not data or "query" not in data:
+        return jsonify({"error": "Missing 'query' in request body"}), 400
+
+    query = data["query"]
+    session_id = data.get("session_id", "default")
+
+    def events():
+        with monitor.request("chat_stream") as record:
+            try:
+                for piece in chatbot.process_query_stream(query, session_id):
+                    yield f"data: {json.dumps({'text': piece})}\n\n"
+                yield f"event: done\ndata: {json.dumps({'session_id': session_id})}\n\n"
+            except Exception as e:
+                logger.exception("Error streaming query")
+                record["status"] = "error"
+                yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.route("/reset", methods=["POST"])
 def reset():
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     session_id = data.get("session_id", "default")
     
-    # Reset context
+    # Reset this session's context only
     try:
-        chatbot.reset_context()
+        chatbot.reset_context(session_id)
         return jsonify({"message": "Conversation reset", "session_id": session_id})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/ready", methods=["GET"])
+def ready():
+    """200 once warm-up has loaded the models and indexes, 503 before; for readiness probes."""
+    status = dict(warmup, components=default_registry.stats())
+    return jsonify(status), 200 if warmup["ready"] else 503
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    # Report the summarizer only once loaded; loading it here would stall the request
+    generator = loaded_summary_generator(config)
+    return jsonify({"cache": chatbot.rag_model.cache.stats(), "batching": chatbot.rag_model.dense.stats(),
+                    "sessions": chatbot.context_builder.sessions.stats(),
+                    "intents": chatbot.rag_model.router.stats(),
+                    "generator": generator.stats() if generator is not None else None,
+                    "startup": default_registry.stats()})
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus text format: request and per-stage latency histograms, cache and intent counts."""
+    for name, cache in chatbot.rag_model.cache.stats().items():
+        for field in ("hits", "misses", "size"):
+            default_metrics.set(f"rag_cache_{field}", cache[field], cache=name)
+    intents = chatbot.rag_model.router.stats()
+    default_metrics.set("rag_intent_queries", intents["queries"])
+    default_metrics.set("rag_llm_calls", intents["llm_calls"])
+    default_metrics.set("rag_ready", int(warmup["ready"]))
+    return Response(default_metrics.render(), mimetype="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
+    # Development server; in production run `gunicorn -c gunicorn.conf.py flask_api:app`
+    app.run(host="0.0.0.0", port=5000, debug=config.get("serving", {}).get("debug", False), threaded=True)
\ No newline at end of file
@@ -0,0 +1,23 @@
+"""Production serving for flask_api.py:
+
+    gunicorn -c gunicorn.conf.py flask_api:app
+
+Settings can be overridden with environment variables (BIND, WORKERS, THREADS, TIMEOUT).
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WORKERS", min(4, multiprocessing.cpu_count())))
+# Threads per worker share its models; micro-batching (serving.batching) groups their requests
+worker_class = "gthread"
+threads = int(os.environ.get("THREADS", 4))
+timeout = int(os.environ.get("TIMEOUT", 120))
+# Each worker loads its models after the fork: torch's thread pools are not fork-safe.
+# The vector store and chunk store are memory-mapped, so workers still share those pages.
+preload_app = False
+
+
+def post_fork(server, worker):
+    # Split the cores between workers instead of every worker's torch/FAISS using all of them
+    os.environ.setdefault("OMP_NUM_THREADS", str(max(1, multiprocessing.cpu_count() // workers)))
@@ -0,0 +1,147 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from modules import registry
+
+
+class MicroBatcher:
+    """Collects items submitted by concurrent callers and processes them in batches.
+
+    A single worker thread takes the first waiting item, then keeps collecting until it has
+    `max_batch_size` items or `max_wait_ms` has passed, calls `process_batch(items)` once
+    and hands each caller the result at its position. If the batch raises, every caller in
+    it gets the exception.
+    """
+
+    def __init__(self, process_batch, max_batch_size=32, max_wait_ms=5, name="micro-batcher"):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, item):
+        """Queue `item` and block until its result is ready."""
+        if self.closed:
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        self.queue.put((item, future))
+        return future.result()
+
+    def _collect(self):
+        first = self.queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                # Finish this batch, then stop
+                self.queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            futures = [future for _, future in batch]
+            try:
+                results = self.process_batch([item for item, _ in batch])
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+    def close(self):
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join()
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+
+class DenseSearch:
+    """Query encoding and FAISS search for RAGModel, micro-batched when `serving.batching.enabled`.
+
+    With batching off every call encodes or searches a single query, as before. With it on,
+    concurrent requests share one `model.encode` call and one batched `index.search`.
+    The encoder and vector store are the process-wide ones from modules/registry.py,
+    loaded on first use.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.model_name = config["embeddings"]["model"]
+        settings = config.get("serving", {}).get("batching", {})
+        self.encoder = None
+        self.searcher = None
+        if settings.get("enabled", False):
+            max_batch_size = settings.get("max_batch_size", 32)
+            max_wait_ms = settings.get("max_wait_ms", 5)
+            self.encoder = MicroBatcher(self._encode_batch, max_batch_size, max_wait_ms, "encode-batcher")
+            self.searcher = MicroBatcher(self._search_batch, max_batch_size, max_wait_ms, "search-batcher")
+
+    @property
+    def model(self):
+        return registry.sentence_transformer(self.model_name)
+
+    @property
+    def vector_store(self):
+        return registry.vector_store(self.config)
+
+    def _encode_batch(self, texts):
+        vectors = np.asarray(self.model.encode(texts, batch_size=len(texts), show_progress_bar=False), dtype=np.float32)
+        return [vector[None, :] for vector in vectors]
+
+    def _search_batch(self, requests):
+        embeddings = np.vstack([embedding for embedding, _ in requests])
+        results = self.vector_store.search_batch(embeddings, max(k for _, k in requests))
+        return [found[:k] for found, (_, k) in zip(results, requests)]
+
+    def encode(self, text):
+        """(1, dimension) embedding of `text`."""
+        if self.encoder is None:
+            return self.model.encode([text], show_progress_bar=False)
+        return self.encoder.submit(text)
+
+    def search(self, embedding, k):
+        if self.searcher is None:
+            return self.vector_store.search(embedding, k)
+        return self.searcher.submit((embedding, k))
+
+    def close(self):
+        for batcher in (self.encoder, self.searcher):
+            if batcher is not None:
+                batcher.close()
+
+    def stats(self):
+        if self.encoder is None:
+            return {"enabled": False}
+        return {"enabled": True, "encode": self.encoder.stats(), "search": self.searcher.stats()}
@@ -0,0 +1,215 @@
+import heapq
+import json
+import math
+import os
+import re
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+PARAMS_FILE = "bm25.json"
+
+STOPWORDS = frozenset("""
+a about above after again all am an and any are as at be because been before being below between both but by
+can could did do does doing down during each few for from further had has have having he her here hers him his
+how i if in into is it its itself just me more most my no nor not now of off on once only or other our ours out
+over own please same she should so some such tell than that the their them then there these they this those
+through to too under until up very was we were what when where which while who whom why will with would you your
+""".split())
+
+
+def tokenize(text):
+    """Lowercased word tokens of `text` without stopwords."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def reciprocal_rank_fusion(result_lists, k=60):
+    """Fuse ranked lists of (id, ...) tuples into one list of (id, score), best first.
+
+    Every list contributes 1 / (k + rank) for each id it contains, so ids ranked well by
+    several retrievers rise to the top regardless of how each retriever scales its scores.
+    """
+    scores = {}
+    for results in result_lists:
+        for rank, result in enumerate(results):
+            scores[result[0]] = scores.get(result[0], 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index of term -> {doc id: term frequency}.
+
+    Only the postings of the query terms are visited, so a search costs the length of those
+    postings rather than the size of the corpus. Documents can be added and removed, which
+    lets the index be updated together with the vector index.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.doc_lengths = {}
+        self.total_length = 0
+
+    @classmethod
+    def from_config(cls, config):
+        retrieval = config["rag"].get("retrieval", {})
+        return cls(retrieval.get("bm25_k1", 1.5), retrieval.get("bm25_b", 0.75))
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, doc_id, text):
+        if doc_id in self.doc_lengths:
+            self.remove(doc_id)
+        tokens = tokenize(text)
+        frequencies = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        for token, frequency in frequencies.items():
+            self.postings.setdefault(token, {})[doc_id] = frequency
+        self.doc_lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, doc_id, text=None):
+        """Remove `doc_id`; pass its `text` to avoid scanning every posting list."""
+        if text is None:
+            self.remove_many([doc_id])
+            return
+        length = self.doc_lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in set(tokenize(text)):
+            posting = self.postings.get(term)
+            if posting and posting.pop(doc_id, None) is not None and not posting:
+                del self.postings[term]
+
+    def remove_many(self, doc_ids):
+        """Remove several documents whose text is unknown with a single pass over the postings."""
+        doc_ids = {doc_id for doc_id in doc_ids if doc_id in self.doc_lengths}
+        if not doc_ids:
+            return
+        for doc_id in doc_ids:
+            self.total_length -= self.doc_lengths.pop(doc_id)
+        for term in list(self.postings):
+            posting = self.postings[term]
+            for doc_id in doc_ids.intersection(posting):
+                del posting[doc_id]
+            if not posting:
+                del self.postings[term]
+
+    def search(self, query, k):
+        """Return up to `k` (doc id, score) pairs, best first."""
+        count = len(self.doc_lengths)
+        if not count:
+            return []
+        average_length = self.total_length / count or 1.0
+        scores = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1.0 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, frequency in posting.items():
+                norm = frequency + self.k1 * (1.0 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1.0) / norm
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def save(self, directory):
+        """Write the index as flat arrays (see FrozenBM25Index) plus bm25.json with k1/b."""
+        doc_ids = sorted(self.doc_lengths)
+        doc_numbers = {doc_id: n for n, doc_id in enumerate(doc_ids)}
+        terms = sorted(self.postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        docs, freqs = [], []
+        for n, term in enumerate(terms):
+            posting = self.postings[term]
+            docs.extend(doc_numbers[doc_id] for doc_id in posting)
+            freqs.extend(posting.values())
+            offsets[n + 1] = len(docs)
+        arrays = {
+            "terms": np.array(terms, dtype=str),
+            "offsets": offsets,
+            "docs": np.array(docs, dtype=np.int32),
+            "freqs": np.array(freqs, dtype=np.int32),
+            "doc_ids": np.array(doc_ids, dtype=str),
+            "lengths": np.array([self.doc_lengths[doc_id] for doc_id in doc_ids], dtype=np.int32),
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(directory, f"bm25_{name}.npy"), array)
+        with open(os.path.join(directory, PARAMS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b}, f)
+
+    @classmethod
+    def load(cls, directory):
+        """Mutable index from the arrays written by `save`, for incremental updates."""
+        frozen = FrozenBM25Index.load(directory, mmap=False)
+        index = cls(frozen.k1, frozen.b)
+        doc_ids = frozen.doc_ids.tolist()
+        index.doc_lengths = dict(zip(doc_ids, frozen.lengths.tolist()))
+        index.total_length = sum(index.doc_lengths.values())
+        docs, freqs = frozen.docs.tolist(), frozen.freqs.tolist()
+        for n, term in enumerate(frozen.terms.tolist()):
+            start, end = int(frozen.offsets[n]), int(frozen.offsets[n + 1])
+            index.postings[term] = {doc_ids[doc]: freq for doc, freq in zip(docs[start:end], freqs[start:end])}
+        return index
+
+
+class FrozenBM25Index:
+    """Read-only BM25 over memory-mapped arrays, for the serving path.
+
+    Terms are sorted, and each term's postings are the slice offsets[i]:offsets[i + 1] of
+    `docs` (document numbers) and `freqs`. With mmap=True worker processes share these
+    pages instead of each holding the index as Python dicts, and scoring a query term is
+    a vectorized operation over its postings.
+    """
+
+    ARRAYS = ("terms", "offsets", "docs", "freqs", "doc_ids", "lengths")
+
+    def __init__(self, k1, b, terms, offsets, docs, freqs, doc_ids, lengths):
+        self.k1 = k1
+        self.b = b
+        self.terms = terms
+        self.offsets = offsets
+        self.docs = docs
+        self.freqs = freqs
+        self.doc_ids = doc_ids
+        self.lengths = lengths
+        self.average_length = float(lengths.mean()) if len(lengths) else 1.0
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, PARAMS_FILE), "r", encoding="utf-8") as f:
+            params = json.load(f)
+        arrays = [np.load(os.path.join(directory, f"bm25_{name}.npy"), mmap_mode="r" if mmap else None)
+                  for name in cls.ARRAYS]
+        return cls(params["k1"], params["b"], *arrays)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def search(self, query, k):
+        """Return up to `k` (doc id, score) pairs, best first."""
+        count = len(self.doc_ids)
+        if not count:
+            return []
+        matched_docs, contributions = [], []
+        for term in set(tokenize(query)):
+            position = int(np.searchsorted(self.terms, term))
+            if position >= len(self.terms) or self.terms[position] != term:
+                continue
+            start, end = int(self.offsets[position]), int(self.offsets[position + 1])
+            docs = np.asarray(self.docs[start:end])
+            freqs = np.asarray(self.freqs[start:end], dtype=np.float32)
+            idf = math.log(1.0 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = freqs + self.k1 * (1.0 - self.b + self.b * self.lengths[docs] / self.average_length)
+            matched_docs.append(docs)
+            contributions.append(idf * freqs * (self.k1 + 1.0) / norm)
+        if not matched_docs:
+            return []
+        docs, inverse = np.unique(np.concatenate(matched_docs), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions))
+        top = np.argsort(-scores, kind="stable")[:k] if len(scores) <= k else np.argpartition(-scores, k)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(str(self.doc_ids[docs[i]]), float(scores[i])) for i in top]
@@ -1,28 +1,47 @@
+import logging
+
 from modules.rag_model import RAGModel
 from modules.context_builder import ContextBuilder
 from modules.config_loader import load_config
+from modules.metrics import configure_logging
+
+logger = logging.getLogger(__name__)
 
 class Chatbot:
     def __init__(self, config):
         self.rag_model = RAGModel(config)
         self.context_builder = ContextBuilder(config)
 
-    def process_query(self, query):
-        # Build context with conversation history
-        context = self.context_builder.build_context(query)
+    def process_query(self, query, session_id="default"):
+        # Only the new query is encoded; earlier turns reuse their cached embeddings
+        query_embedding = self.rag_model.embed_query(query)
+        # Build a bounded retrieval query from this session's conversation history
+        context = self.context_builder.build_context(query, session_id, query_embedding)
         # Get response from RAG model
-        response = self.rag_model.answer_query(context)
-        # Log for debugging
-        print(f"Query: {query}\nResponse: {response}")
+        response = self.rag_model.answer_query(query, context)
+        logger.debug("Query: %s\nResponse: %s", query, response)
         # Update context with new interaction
-        self.context_builder.add_interaction(query, response)
+        self.context_builder.add_interaction(query, response, session_id, query_embedding)
         return response
 
-    def reset_context(self):
-        self.context_builder.clear_context()
+    def process_query_stream(self, query, session_id="default"):
+        """Yield the response in pieces; the session is updated once it is complete."""
+        query_embedding = self.rag_model.embed_query(query)
+        context = self.context_builder.build_context(query, session_id, query_embedding)
+        pieces = []
+        for piece in self.rag_model.answer_query_stream(query, context):
+            pieces.append(piece)
+            yield piece
+        response = "".join(pieces)
+        logger.debug("Query: %s\nResponse: %s", query, response)
+        self.context_builder.add_interaction(query, response, session_id, query_embedding)
+
+    def reset_context(self, session_id="default"):
+        self.context_builder.clear_context(session_id)
 
 if __name__ == "__main__":
     config = load_config()
+    configure_logging(config)
     chatbot = Chatbot(config)
     queries = [
         "What is the interest rate of fixed deposit",
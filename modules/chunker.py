@@ -0,0 +1,64 @@
+from modules.config_loader import load_config
+from modules.document_store import DocumentStore
+
+class Chunker:
+    """Splits knowledgebase documents into overlapping chunks for embedding and retrieval.
+
+    Chunks are at most `rag.chunk_size` characters, overlap by `rag.chunk_overlap`
+    characters and break on whitespace where possible. Each chunk keeps its parent
+    `doc_id` and the `start`/`end` character offsets into the parent content.
+    """
+
+    def __init__(self, config):
+        self.chunk_size = config["rag"]["chunk_size"]
+        self.chunk_overlap = min(config["rag"].get("chunk_overlap", 0), self.chunk_size // 2)
+        self.store = DocumentStore.from_config(config)
+        self.chunk_store = DocumentStore.chunks_from_config(config)
+
+    def split(self, text):
+        """Yield (start, end) offsets of the chunks of `text`."""
+        length = len(text)
+        start = 0
+        while start < length:
+            end = min(start + self.chunk_size, length)
+            if end < length:
+                # Back off to the last whitespace in the second half of the window
+                cut = text.rfind(" ", start + self.chunk_size // 2, end)
+                if cut != -1:
+                    end = cut
+            yield start, end
+            if end >= length:
+                return
+            next_start = max(end - self.chunk_overlap, start + 1)
+            # Start the next chunk on a word boundary
+            space = text.find(" ", next_start, end)
+            start = space + 1 if self.chunk_overlap and space != -1 else next_start
+            while start < length and text[start] == " ":
+                start += 1
+
+    def iter_chunks(self, documents):
+        """Yield chunk records for `documents` one at a time, so memory stays bounded."""
+        for document in documents:
+            content = document["content"]
+            for n, (start, end) in enumerate(self.split(content)):
+                yield {
+                    "id": f"{document['id']}#{n}",
+                    "doc_id": document["id"],
+                    "start": start,
+                    "end": end,
+                    "content": content[start:end],
+                }
+
+    def build(self):
+        count = 0
+        with self.chunk_store.writer() as writer:
+            for chunk in self.iter_chunks(self.store.load()):
+                writer.add(chunk)
+                count += 1
+        print(f"Split {len(self.store)} documents into {count} chunks in {self.chunk_store.root}")
+        return self.chunk_store
+
+if __name__ == "__main__":
+    config = load_config()
+    chunker = Chunker(config)
+    chunker.build()
@@ -1,27 +1,106 @@
-from collections import deque
+import numpy as np
 from modules.config_loader import load_config
+from modules.session_store import session_store_from_config
+
+def count_tokens(text):
+    """Approximate token count: whitespace-separated words."""
+    return len(text.split())
+
+def truncate_tokens(text, budget):
+    words = text.split()
+    return text if len(words) <= budget else " ".join(words[-budget:])
 
 class ContextBuilder:
-    def __init__(self, config):
-        self.context_window = config["chatbot"]["context_window"]
-        self.history = deque(maxlen=self.context_window)
+    """Builds a bounded retrieval query from the current turn and a session's recent turns.
+
+    Histories live in a session store keyed by session_id (see modules/session_store.py),
+    so concurrent users never see or reset each other's conversation. Each stored turn
+    caches the user query's token count and its embedding as a float32 array (~1.5 KB for
+    384 dimensions), so building the next context never re-encodes old turns.
+
+    The retrieval query only uses user turns, never bot answers:
+    - `query`: the current query followed by earlier user queries, newest first, within
+      `chatbot.query_token_budget` tokens
+    - `embedding`: the current query embedding plus the embeddings of those same turns,
+      weighted by `chatbot.history_weight` ** age
+    `transcript` renders the conversation within `chatbot.history_token_budget` tokens on
+    demand, for generators that want it. The work per turn is bounded by `context_window`,
+    however long the conversation gets.
+    """
+
+    def __init__(self, config, sessions=None):
+        chatbot = config["chatbot"]
+        self.context_window = chatbot["context_window"]
+        self.query_token_budget = chatbot.get("query_token_budget", 48)
+        self.history_token_budget = chatbot.get("history_token_budget", 256)
+        self.history_weight = chatbot.get("history_weight", 0.5)
+        self.sessions = sessions if sessions is not None else session_store_from_config(config)
+
+    def add_interaction(self, query, response, session_id="default", query_embedding=None):
+        interaction = {
+            "query": query,
+            "response": response,
+            "query_tokens": count_tokens(query),
+        }
+        if query_embedding is not None:
+            interaction["embedding"] = np.array(query_embedding, dtype=np.float32).reshape(-1)
+        self.sessions.append(session_id, interaction)
+
+    def build_context(self, current_query, session_id="default", query_embedding=None):
+        """Return {"query", "embedding"} for `current_query`.
+
+        `embedding` is None when `query_embedding` is not given.
+        """
+        history = self.sessions.get(session_id)[-self.context_window:]
+
+        query = truncate_tokens(current_query, self.query_token_budget)
+        used = count_tokens(query)
+        query_turns = []
+        for interaction in reversed(history):
+            tokens = interaction.get("query_tokens", count_tokens(interaction["query"]))
+            if used + tokens > self.query_token_budget:
+                break
+            query_turns.append(interaction)
+            used += tokens
+        query = " ".join([query] + [interaction["query"] for interaction in query_turns])
+
+        embedding = None
+        if query_embedding is not None:
+            current = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+            embedding = current.copy()
+            weight = 1.0
+            for interaction in query_turns:
+                weight *= self.history_weight
+                if "embedding" in interaction:
+                    embedding += weight * np.asarray(interaction["embedding"], dtype=np.float32)
+            # Keep the scale of a single query embedding so distance thresholds still apply
+            norm = np.linalg.norm(embedding)
+            if norm:
+                embedding *= np.linalg.norm(current) / norm
+            embedding = embedding[None, :]
 
-    def add_interaction(self, query, response):
-        self.history.append({"query": query, "response": response})
+        return {"query": query, "embedding": embedding}
 
-    def build_context(self, current_query):
-        context = ""
-        for interaction in self.history:
-            context += f"User: {interaction['query']}\nBot: {interaction['response']}\n"
-        context += f"User: {current_query}\n"
-        return context
+    def transcript(self, current_query, session_id="default"):
+        """The session's latest turns as "User/Bot" text within `history_token_budget` tokens,
+        followed by `current_query`."""
+        turns = []
+        used = 0
+        for interaction in reversed(self.sessions.get(session_id)[-self.context_window:]):
+            text = f"User: {interaction['query']}\nBot: {interaction['response']}\n"
+            tokens = count_tokens(text)
+            if used + tokens > self.history_token_budget:
+                break
+            turns.append(text)
+            used += tokens
+        return "".join(reversed(turns)) + f"User: {current_query}\n"
 
-    def clear_context(self):
-        self.history.clear()
+    def clear_context(self, session_id="default"):
+        self.sessions.clear(session_id)
 
 if __name__ == "__main__":
     config = load_config()
     context_builder = ContextBuilder(config)
     context_builder.add_interaction("What is the website about?", "It's about tech news.")
-    context = context_builder.build_context("Tell me more.")
-    print(context)
\ No newline at end of file
+    print(context_builder.build_context("Tell me more."))
+    print(context_builder.transcript("Tell me more."))
@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+
+
+class CrawlManifest:
+    """On-disk record of what each url looked like on the last crawl.
+
+    Every entry stores the saved filename, the ETag/Last-Modified validators sent by the
+    server, hashes of the raw response and of the cleaned content and the content's SimHash,
+    so the next crawl can send conditional requests and skip pages that have not changed. During a run it also
+    collects the filenames that were written (changed) and those whose url disappeared
+    (removed).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.seen = set()
+        self.changed = []
+        self.removed = []
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def get(self, url):
+        return self.entries.get(url)
+
+    def conditional_headers(self, url):
+        entry = self.entries.get(url)
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def mark_seen(self, url):
+        with self.lock:
+            self.seen.add(url)
+
+    def record(self, url, filename, etag, last_modified, raw_hash, content_hash, written, simhash=None):
+        with self.lock:
+            self.seen.add(url)
+            self.entries[url] = {
+                "filename": filename,
+                "etag": etag,
+                "last_modified": last_modified,
+                "raw_hash": raw_hash,
+                "content_hash": content_hash,
+                "simhash": simhash,
+            }
+            if written:
+                self.changed.append(filename)
+
+    def remove(self, url):
+        """Forget `url` and return the filename it had been saved under, if any."""
+        with self.lock:
+            self.seen.discard(url)
+            entry = self.entries.pop(url, None)
+            filename = entry.get("filename") if entry else None
+            if filename:
+                self.removed.append(filename)
+        return filename
+
+    def mark_removed(self, filename):
+        with self.lock:
+            self.removed.append(filename)
+
+    def unseen_urls(self):
+        return [url for url in self.entries if url not in self.seen]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
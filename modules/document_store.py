@@ -0,0 +1,285 @@
+import json
+import mmap
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+
+class DocumentStore:
+    """Sharded JSONL knowledgebase that is written one record at a time and read back by id.
+
+    Records are dicts with at least an "id". They are appended to shard files of at most
+    `shard_size` records, and `index.json` maps every id to its (shard, offset, length), so
+    `get` reads a single line and iteration streams the shards without loading them whole.
+    Each write publishes a new version: shards get version-prefixed names and the index is
+    replaced atomically, so readers never see a half-written store.
+
+    For the query path every version also gets `<version>-ids.npy` (sorted ids) and
+    `<version>-locations.npy` (their shard, offset, length rows), and a small `current.json`
+    naming the version's shards and arrays, so DocumentIndex can memory-map everything.
+    """
+
+    INDEX_FILE = "index.json"
+    CURRENT_FILE = "current.json"
+
+    def __init__(self, root, shard_size=10000):
+        self.root = root
+        self.shard_size = shard_size
+        self.index_path = os.path.join(root, self.INDEX_FILE)
+        self.current_path = os.path.join(root, self.CURRENT_FILE)
+        self.index = None
+        self.handles = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        kb_config = config["knowledgebase"]
+        return cls(kb_config["output_dir"], kb_config.get("shard_size", 10000))
+
+    @classmethod
+    def chunks_from_config(cls, config):
+        """The store holding the chunks the Chunker splits the knowledgebase into."""
+        kb_config = config["knowledgebase"]
+        chunks_dir = kb_config.get("chunks_dir", os.path.join(kb_config["output_dir"], "chunks"))
+        return cls(chunks_dir, kb_config.get("shard_size", 10000))
+
+    def exists(self):
+        return os.path.exists(self.index_path)
+
+    def load(self):
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            self.index = json.load(f)
+        self.close()
+        return self
+
+    def _loaded_index(self):
+        if self.index is None:
+            self.load()
+        return self.index
+
+    @property
+    def version(self):
+        return self._loaded_index()["version"]
+
+    def writer(self):
+        return DocumentStoreWriter(self)
+
+    def ids(self):
+        return list(self._loaded_index()["offsets"])
+
+    def __len__(self):
+        return len(self._loaded_index()["offsets"])
+
+    def __contains__(self, doc_id):
+        return doc_id in self._loaded_index()["offsets"]
+
+    def get(self, doc_id):
+        location = self._loaded_index()["offsets"].get(doc_id)
+        if location is None:
+            return None
+        shard, offset, length = location
+        with self.lock:
+            handle = self.handles.get(shard)
+            if handle is None:
+                handle = open(os.path.join(self.root, self.index["shards"][shard]), "rb")
+                self.handles[shard] = handle
+            handle.seek(offset)
+            line = handle.read(length)
+        return json.loads(line)
+
+    def __iter__(self):
+        for shard_name in self._loaded_index()["shards"]:
+            with open(os.path.join(self.root, shard_name), "rb") as f:
+                for line in f:
+                    yield json.loads(line)
+
+    def close(self):
+        with self.lock:
+            for handle in self.handles.values():
+                handle.close()
+            self.handles = {}
+
+
+class DocumentStoreWriter:
+    """Streams records into new shards and publishes them as the store's next version."""
+
+    def __init__(self, store):
+        self.store = store
+        self.version = str(time.time_ns())
+        self.shards = []
+        self.offsets = {}
+        self.handle = None
+        self.count_in_shard = 0
+        os.makedirs(store.root, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def add(self, record):
+        if record["id"] in self.offsets:
+            raise ValueError(f"Duplicate document id {record['id']}")
+        if self.handle is None or self.count_in_shard >= self.store.shard_size:
+            self._next_shard()
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        self.offsets[record["id"]] = [len(self.shards) - 1, self.handle.tell(), len(line)]
+        self.handle.write(line)
+        self.count_in_shard += 1
+
+    def _next_shard(self):
+        if self.handle is not None:
+            self.handle.close()
+        name = f"{self.version}-{len(self.shards):05d}.jsonl"
+        self.shards.append(name)
+        self.handle = open(os.path.join(self.store.root, name), "wb")
+        self.count_in_shard = 0
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+        ids = sorted(self.offsets)
+        arrays = {"ids": f"{self.version}-ids.npy", "locations": f"{self.version}-locations.npy"}
+        np.save(os.path.join(self.store.root, arrays["ids"]), np.array(ids, dtype=str))
+        np.save(os.path.join(self.store.root, arrays["locations"]),
+                np.array([self.offsets[doc_id] for doc_id in ids], dtype=np.int64).reshape(-1, 3))
+        index = {"version": self.version, "shards": self.shards, "offsets": self.offsets}
+        current = dict(version=self.version, shards=self.shards, **arrays)
+        for path, content in ((self.store.index_path, index), (self.store.current_path, current)):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(content, f)
+            os.replace(tmp_path, path)
+        # Files of older versions are no longer referenced; open readers keep their mappings
+        keep = set(self.shards) | set(arrays.values())
+        for name in os.listdir(self.store.root):
+            if name.endswith((".jsonl", ".npy")) and name not in keep:
+                try:
+                    os.remove(os.path.join(self.store.root, name))
+                except OSError as e:
+                    print(f"Could not remove old file {name}: {e}")
+        self.store.load()
+
+    def abort(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+        for name in self.shards + [f"{self.version}-ids.npy", f"{self.version}-locations.npy"]:
+            path = os.path.join(self.store.root, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class DocumentIndex:
+    """Long-lived, memory-mapped read view of a DocumentStore for the query path.
+
+    Shards and the sorted id/location arrays are memory-mapped, so worker processes serving
+    the same store share those pages instead of each holding a copy; `get` is a binary
+    search over the ids plus a slice of a shard. Normalized token sets are computed once per document and kept.
+    `maybe_reload` swaps to a newly written store version (checked at most every
+    `reload_interval` seconds).
+    """
+
+    TOKEN_PATTERN = re.compile(r"\w+")
+
+    def __init__(self, store, reload_interval=5):
+        self.store = store
+        self.reload_interval = reload_interval
+        self.lock = threading.Lock()
+        self.version = None
+        self.ids = np.empty(0, dtype=str)
+        self.locations = np.empty((0, 3), dtype=np.int64)
+        self.shards = []
+        self.token_sets = {}
+        self.last_reload_check = 0.0
+
+    def _read_current(self):
+        if os.path.exists(self.store.current_path):
+            with open(self.store.current_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        # Stores written before current.json existed: build the arrays in memory
+        with open(self.store.index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        ids = sorted(index["offsets"])
+        index["ids"] = np.array(ids, dtype=str)
+        index["locations"] = np.array([index["offsets"][doc_id] for doc_id in ids], dtype=np.int64).reshape(-1, 3)
+        return index
+
+    def load(self):
+        current = self._read_current()
+        shards = []
+        for name in current["shards"]:
+            with open(os.path.join(self.store.root, name), "rb") as f:
+                shards.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        ids, locations = current["ids"], current["locations"]
+        if isinstance(ids, str):
+            ids = np.load(os.path.join(self.store.root, ids), mmap_mode="r")
+            locations = np.load(os.path.join(self.store.root, locations), mmap_mode="r")
+        with self.lock:
+            old_shards = self.shards
+            self.version = current["version"]
+            self.ids = ids
+            self.locations = locations
+            self.shards = shards
+            self.token_sets = {}
+        # Old mappings are left to the garbage collector; a concurrent get may still be reading them
+        del old_shards
+        self.last_reload_check = time.monotonic()
+        return self
+
+    def maybe_reload(self):
+        """Load a newer store version if one was written; returns True if it did."""
+        now = time.monotonic()
+        if self.version is not None and now - self.last_reload_check < self.reload_interval:
+            return False
+        self.last_reload_check = now
+        try:
+            path = self.store.current_path if os.path.exists(self.store.current_path) else self.store.index_path
+            with open(path, "r", encoding="utf-8") as f:
+                version = json.load(f)["version"]
+            if version == self.version:
+                return False
+            self.load()
+        except FileNotFoundError:
+            # Not written yet, or replaced while we were loading; try again at the next check
+            return False
+        return True
+
+    def _position(self, ids, doc_id):
+        position = int(np.searchsorted(ids, doc_id))
+        if position < len(ids) and ids[position] == doc_id:
+            return position
+        return None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, doc_id):
+        return self._position(self.ids, doc_id) is not None
+
+    def get(self, doc_id):
+        with self.lock:
+            position = self._position(self.ids, doc_id)
+            if position is None:
+                return None
+            shard, offset, length = (int(value) for value in self.locations[position])
+            line = self.shards[shard][offset:offset + length]
+        return json.loads(line)
+
+    def tokens(self, doc_id, content=None):
+        """Lowercased word tokens of a document, computed on first use and cached."""
+        token_set = self.token_sets.get(doc_id)
+        if token_set is None:
+            if content is None:
+                content = self.get(doc_id)["content"]
+            token_set = frozenset(self.TOKEN_PATTERN.findall(content.lower()))
+            self.token_sets[doc_id] = token_set
+        return token_set
@@ -0,0 +1,40 @@
+import json
+import os
+
+import numpy as np
+
+EMBEDDINGS_FILE = "embeddings.npy"
+IDS_FILE = "ids.npy"
+HASHES_FILE = "hashes.npy"
+META_FILE = "embeddings_meta.json"
+
+
+def load_embeddings(embedding_dir, mmap=True):
+    """Return (ids, vectors) written by EmbeddingGenerator.
+
+    `vectors` is a contiguous float32 matrix with one row per id; both arrays are plain
+    numpy files, memory-mapped by default, so no pickling is involved.
+    """
+    mmap_mode = "r" if mmap else None
+    vectors = np.load(os.path.join(embedding_dir, EMBEDDINGS_FILE), mmap_mode=mmap_mode)
+    ids = np.load(os.path.join(embedding_dir, IDS_FILE), mmap_mode=mmap_mode)
+    return ids, vectors
+
+
+def load_hashes(embedding_dir):
+    return np.load(os.path.join(embedding_dir, HASHES_FILE), mmap_mode="r")
+
+
+def load_meta(embedding_dir):
+    path = os.path.join(embedding_dir, META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_meta(embedding_dir, meta):
+    tmp_path = os.path.join(embedding_dir, META_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(embedding_dir, META_FILE))
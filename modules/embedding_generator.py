@@ -1,31 +1,98 @@
-from sentence_transformers import SentenceTransformer
+import hashlib
 import os
-import json
 import numpy as np
+from tqdm import tqdm
 from modules.config_loader import load_config
+from modules.document_store import DocumentStore
+from modules.registry import sentence_transformer
+from modules.embedding_files import (
+    EMBEDDINGS_FILE, HASHES_FILE, IDS_FILE, load_embeddings, load_hashes, load_meta, save_meta,
+)
+
+def content_hash(text):
+    """Cache key of a chunk's embedding."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
 
 class EmbeddingGenerator:
-    def __init__(self, config):
+    def __init__(self, config, model=None):
         self.model_name = config["embeddings"]["model"]
-        self.model = SentenceTransformer(self.model_name)
-        self.input_dir = config["knowledgebase"]["output_dir"]
+        # Anything with SentenceTransformer's encode/get_sentence_embedding_dimension will do
+        self.model = model if model is not None else sentence_transformer(self.model_name)
+        self.batch_size = config["embeddings"].get("batch_size", 64)
+        # Embeddings are generated per chunk, see modules/chunker.py
+        self.store = DocumentStore.chunks_from_config(config)
         self.output_dir = config["embeddings"]["output_dir"]
         os.makedirs(self.output_dir, exist_ok=True)
 
+    def load_cache(self):
+        """Map content hash -> row of the previous run's embeddings, if made with the same model."""
+        meta = load_meta(self.output_dir)
+        if not meta or meta.get("model") != self.model_name:
+            return {}, None
+        try:
+            _, vectors = load_embeddings(self.output_dir)
+            hashes = load_hashes(self.output_dir)
+        except FileNotFoundError:
+            return {}, None
+        return {str(content_hash): row for row, content_hash in enumerate(hashes)}, vectors
+
     def generate(self):
-        with open(os.path.join(self.input_dir, "knowledgebase.json"), "r") as f:
-            knowledgebase = json.load(f)
-        
-        embeddings = []
-        for item in knowledgebase:
-            embedding = self.model.encode(item["content"], show_progress_bar=False)
-            embeddings.append({"id": item["id"], "embedding": embedding})
-        
-        # Save embeddings
-        np.save(os.path.join(self.output_dir, "embeddings.npy"), embeddings)
-        return embeddings
+        """Embed every chunk into a float32 matrix, re-encoding only content not seen last run.
+
+        Chunks are streamed from the store and cache misses are encoded in batches of
+        `batch_size`. Writes embeddings.npy (rows), ids.npy and hashes.npy (one entry per
+        row) and returns (ids, embeddings).
+        """
+        store = self.store.load()
+        cache, cached_vectors = self.load_cache()
+        count = len(store)
+        dimension = self.model.get_sentence_embedding_dimension()
+
+        tmp_path = os.path.join(self.output_dir, "embeddings.tmp.npy")
+        embeddings = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(count, dimension))
+        ids, hashes = [], []
+        batch_rows, batch_texts = [], []
+        encoded = 0
+
+        for row, item in enumerate(tqdm(store, total=count, desc="Embedding chunks")):
+            item_hash = content_hash(item["content"])
+            ids.append(item["id"])
+            hashes.append(item_hash)
+            cached_row = cache.get(item_hash)
+            if cached_row is not None:
+                embeddings[row] = cached_vectors[cached_row]
+                continue
+            batch_rows.append(row)
+            batch_texts.append(item["content"])
+            encoded += 1
+            if len(batch_texts) >= self.batch_size:
+                self._encode_into(embeddings, batch_rows, batch_texts)
+        if batch_texts:
+            self._encode_into(embeddings, batch_rows, batch_texts)
+        embeddings.flush()
+        # Close the memory maps before the file is renamed over embeddings.npy
+        del embeddings, cached_vectors
+        self.save(tmp_path, ids, hashes, dimension)
+        print(f"Embedded {count} chunks: {encoded} encoded, {count - encoded} reused from cache")
+        return load_embeddings(self.output_dir)
+
+    def _encode_into(self, embeddings, rows, texts):
+        """Encode `texts` into `embeddings[rows]`, then empty both lists for the next batch."""
+        vectors = self.model.encode(texts, batch_size=self.batch_size, show_progress_bar=False)
+        embeddings[rows] = np.asarray(vectors, dtype=np.float32)
+        rows.clear()
+        texts.clear()
+
+    def save(self, embeddings_path, ids, hashes, dimension):
+        """Publish the .npy matrix at `embeddings_path` with its ids and content hashes."""
+        np.save(os.path.join(self.output_dir, "ids.tmp.npy"), np.array(ids, dtype=str))
+        np.save(os.path.join(self.output_dir, "hashes.tmp.npy"), np.array(hashes, dtype=str))
+        os.replace(embeddings_path, os.path.join(self.output_dir, EMBEDDINGS_FILE))
+        os.replace(os.path.join(self.output_dir, "ids.tmp.npy"), os.path.join(self.output_dir, IDS_FILE))
+        os.replace(os.path.join(self.output_dir, "hashes.tmp.npy"), os.path.join(self.output_dir, HASHES_FILE))
+        save_meta(self.output_dir, {"model": self.model_name, "dimension": dimension, "count": len(ids)})
 
 if __name__ == "__main__":
     config = load_config()
     generator = EmbeddingGenerator(config)
-    generator.generate()
\ No newline at end of file
+    generator.generate()
@@ -0,0 +1,117 @@
+import threading
+
+from modules.batcher import MicroBatcher
+
+BACKENDS = ("torch", "int8", "onnx")
+
+
+class SummaryGenerator:
+    """Seq2seq summarizer used by RAGModel for open questions, tuned for CPU serving.
+
+    `generator.backend` picks how the model runs:
+    - torch: the plain transformers model
+    - int8: torch dynamic quantization of the Linear layers, usually ~2x faster on CPU
+    - onnx: exported to and run by onnxruntime through optimum (pip install optimum[onnxruntime])
+
+    `generator.model` may be a hub name or a local directory; with `local_files_only`
+    nothing is downloaded, so a tiny local model can stand in for tests. With
+    `generator.batching.enabled`, concurrent `summarize` calls share one `generate` call.
+    `stream` yields the summary piece by piece as tokens are decoded.
+    """
+
+    def __init__(self, config):
+        settings = config.get("generator", {})
+        self.model_name = settings.get("model", "sshleifer/distilbart-cnn-12-6")
+        self.backend = settings.get("backend", "torch")
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown generator backend {self.backend!r}; expected one of {', '.join(BACKENDS)}")
+        self.local_files_only = settings.get("local_files_only", False)
+        self.max_input_tokens = settings.get("max_input_tokens", 512)
+        self.generate_kwargs = {
+            "max_length": settings.get("max_length", 100),
+            "min_length": settings.get("min_length", 30),
+            "do_sample": False,
+        }
+        if settings.get("num_beams"):
+            self.generate_kwargs["num_beams"] = settings["num_beams"]
+        self.tokenizer, self.model = self.load_model()
+
+        batching = settings.get("batching", {})
+        self.batcher = None
+        if batching.get("enabled", False):
+            self.batcher = MicroBatcher(self.generate, batching.get("max_batch_size", 8),
+                                        batching.get("max_wait_ms", 20), "generator-batcher")
+
+    def load_model(self):
+        from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name, local_files_only=self.local_files_only)
+        if self.backend == "onnx":
+            try:
+                from optimum.onnxruntime import ORTModelForSeq2SeqLM
+            except ImportError as e:
+                raise ImportError("The onnx generator backend needs optimum[onnxruntime]") from e
+            model = ORTModelForSeq2SeqLM.from_pretrained(self.model_name, export=True,
+                                                         local_files_only=self.local_files_only)
+            return tokenizer, model
+
+        import torch
+
+        model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name, local_files_only=self.local_files_only)
+        model.eval()
+        if self.backend == "int8":
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return tokenizer, model
+
+    def _inputs(self, prompts):
+        return self.tokenizer(prompts, return_tensors="pt", padding=True, truncation=True,
+                              max_length=self.max_input_tokens)
+
+    def generate(self, prompts):
+        """Summaries of `prompts`, generated as one padded batch."""
+        import torch
+
+        with torch.inference_mode():
+            output = self.model.generate(**self._inputs(prompts), **self.generate_kwargs)
+        return self.tokenizer.batch_decode(output, skip_special_tokens=True)
+
+    def summarize(self, prompt):
+        if self.batcher is None:
+            return self.generate([prompt])[0]
+        return self.batcher.submit(prompt)
+
+    def stream(self, prompt):
+        """Yield the summary of `prompt` in pieces as it is generated.
+
+        Streaming decodes greedily (num_beams=1), as beam search cannot emit partial output.
+        """
+        import torch
+        from transformers import TextIteratorStreamer
+
+        streamer = TextIteratorStreamer(self.tokenizer, skip_special_tokens=True)
+        kwargs = dict(self._inputs([prompt]), streamer=streamer, **self.generate_kwargs)
+        kwargs["num_beams"] = 1
+        errors = []
+
+        def run():
+            try:
+                with torch.inference_mode():
+                    self.model.generate(**kwargs)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        thread = threading.Thread(target=run, name="generator-stream", daemon=True)
+        thread.start()
+        for piece in streamer:
+            if piece:
+                yield piece
+        thread.join()
+        if errors:
+            raise errors[0]
+
+    def stats(self):
+        stats = {"model": self.model_name, "backend": self.backend}
+        if self.batcher is not None:
+            stats["batching"] = self.batcher.stats()
+        return stats
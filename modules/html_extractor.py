@@ -0,0 +1,132 @@
+import re
+from html.parser import HTMLParser
+
+# Boilerplate removed from every page
+SKIP_TAGS = {"header", "footer", "nav", "button", "a", "form", "script", "style", "noscript", "template"}
+SKIP_CLASSES = {"navbar", "footer", "menu", "header", "skip-to-content", "profile-icon", "consent", "disclaimer"}
+SKIP_IDS = {"navbar", "footer", "menu", "header"}
+TEXT_TAGS = {"p", "h1", "h2", "h3", "td", "th"}
+MAIN_TAGS = {"main", "article"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+NOISY_PHRASES = [
+    "by continuing, you agree to",
+    "authorize our representatives",
+    "call/email/sms/whatsapp",
+    "apply online",
+    "digital fixed deposit booking",
+    "open fixed investment plan online",
+    "please enter the monthly installment amount",
+    "popular faqs",
+    "recent faqs",
+    "most viewed faqs",
+    "the common man's partner in prosperity",
+    "features & benefits",
+    "faqs",
+    "step 01", "step 02", "step 03", "step 04",
+    "our interest rates starts from",
+    "we’re here for you",
+    "check out the latest"
+]
+
+# Longest phrases first so "popular faqs" wins over "faqs"
+NOISE_PATTERN = re.compile("|".join(re.escape(phrase) for phrase in sorted(NOISY_PHRASES, key=len, reverse=True)))
+SPACE_PATTERN = re.compile(r"\s+")
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+        self.skip_depth = 0
+        self.capture_depth = None
+        self.buffer = []
+        self.main_state = "before"
+        self.main_depth = None
+        self.segments = []
+        self.main_segments = []
+
+    def _skipped(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            return True
+        for name, value in attrs:
+            if not value:
+                continue
+            if name == "class" and not SKIP_CLASSES.isdisjoint(value.split()):
+                return True
+            if name == "id" and value in SKIP_IDS:
+                return True
+        return False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            return
+        self.stack.append(tag)
+        depth = len(self.stack)
+        if self.skip_depth:
+            return
+        if self._skipped(tag, attrs):
+            self.skip_depth = depth
+        elif tag in MAIN_TAGS and self.main_state == "before":
+            self.main_state = "inside"
+            self.main_depth = depth
+        elif tag in TEXT_TAGS and self.capture_depth is None:
+            self.capture_depth = depth
+            self.buffer = []
+
+    def handle_startendtag(self, tag, attrs):
+        pass
+
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            return
+        # Pop up to the matching open tag, closing anything left unclosed inside it
+        while self.stack:
+            depth = len(self.stack)
+            open_tag = self.stack.pop()
+            if self.skip_depth == depth:
+                self.skip_depth = 0
+            elif self.capture_depth == depth:
+                self._flush()
+            elif self.main_depth == depth:
+                self.main_state = "after"
+                self.main_depth = None
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.capture_depth is not None and not self.skip_depth:
+            text = data.strip()
+            if text:
+                self.buffer.append(text)
+
+    def _flush(self):
+        self.capture_depth = None
+        if self.buffer:
+            text = " ".join(self.buffer)
+            self.segments.append(text)
+            if self.main_state == "inside":
+                self.main_segments.append(text)
+        self.buffer = []
+
+    def text(self):
+        while self.stack:
+            self.handle_endtag(self.stack[-1])
+        return " ".join(self.main_segments if self.main_state != "before" else self.segments)
+
+
+def extract_text(html):
+    """Return the cleaned, lowercased body text of `html`, or None if nothing is left.
+
+    A single pass over the document drops headers, footers, navigation, links, buttons,
+    forms and site chrome classes/ids, and collects text from paragraphs, headings and
+    table cells, restricted to the first <main>/<article> when the page has one. A text
+    element nested in another one contributes its text once. All noisy phrases are then
+    removed with one compiled pattern.
+    """
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    cleaned = NOISE_PATTERN.sub("", parser.text().lower())
+    cleaned = SPACE_PATTERN.sub(" ", cleaned).strip()
+    return cleaned if cleaned else None
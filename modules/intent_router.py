@@ -0,0 +1,142 @@
+import logging
+import re
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _keyword_list(route, query, retrieved_docs, context):
+    """Answer listing the `items` whose keyword appears in any retrieved chunk."""
+    found = set()
+    for doc in retrieved_docs:
+        content = doc["content"].lower()
+        for keyword, item in route["items"].items():
+            if keyword in content:
+                found.add(item)
+    logger.debug("%s items = %s", route["name"], sorted(found))
+    if found:
+        return route["template"].format(items="\n- ".join(sorted(found)))
+    return route.get("fallback")
+
+
+def _rates(route, query, retrieved_docs, context):
+    """Answer with the distinct percentages in the context that fall within [min, max]."""
+    rates = route["pattern"].findall(context)
+    rates = sorted({rate for rate in rates if route.get("min", 0.0) <= float(rate.split("%")[0]) <= route.get("max", 100.0)})
+    if rates:
+        logger.debug("Extracted rates: %s", rates)
+        return route["template"].format(rates=", ".join(rates))
+    logger.debug("No interest rates found in context. Context sample: %s", context[:1000])
+    return route.get("fallback")
+
+
+def _static(route, query, retrieved_docs, context):
+    """Fixed answer, given only if a `requires` phrase is in a retrieved chunk's id or content."""
+    requires = route.get("requires", [])
+    for doc in retrieved_docs:
+        text = doc["id"].lower() + " " + doc["content"].lower()
+        if not requires or any(phrase in text for phrase in requires):
+            return route["answer"]
+    return None
+
+
+EXTRACTORS = {
+    "keyword_list": _keyword_list,
+    "rates": _rates,
+    "static": _static,
+}
+
+
+class IntentRouter:
+    """Answers templated intents from retrieved chunks so only open questions reach the LLM.
+
+    Routes come from the `intents` section of config.yml. Their `patterns` are compiled
+    into one regex of zero-width lookaheads, one named group per route, anchored at the
+    start of the lowercased query: a single match call finds the first route, in config
+    order, with a matching pattern. Queries that match no pattern can still be routed by
+    cosine similarity to a route's `examples`, whose embeddings are computed once when
+    they are first needed. The route's extractor then builds the answer; if it returns None
+    the query goes to the summarizer.
+    """
+
+    def __init__(self, routes, encode=None, similarity=0.8):
+        self.routes = []
+        alternatives = []
+        for n, route in enumerate(routes):
+            route = dict(route)
+            if route["extractor"] not in EXTRACTORS:
+                raise ValueError(f"Unknown extractor {route['extractor']!r} for intent {route['name']!r}")
+            if "pattern" in route:
+                route["pattern"] = re.compile(route["pattern"], re.IGNORECASE)
+            self.routes.append(route)
+            if route.get("patterns"):
+                alternatives.append(f"(?P<route{n}>(?=.*?(?:{'|'.join(route['patterns'])})))")
+        self.matcher = re.compile("|".join(alternatives), re.DOTALL) if alternatives else None
+
+        self.encode = encode
+        self.similarity = similarity
+        self.examples = [(n, text) for n, route in enumerate(self.routes) for text in route.get("examples", [])]
+        self.example_routes = [n for n, _ in self.examples]
+        self.example_vectors = None
+
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.llm_calls = 0
+        self.answered = {}
+
+    @classmethod
+    def from_config(cls, config, encode=None):
+        settings = config.get("intents", {})
+        return cls(settings.get("routes", []), encode, settings.get("similarity", 0.8))
+
+    def match(self, query):
+        """The route for `query`, or None."""
+        query_lower = query.lower()
+        if self.matcher is not None:
+            found = self.matcher.match(query_lower)
+            if found:
+                return self.routes[int(found.lastgroup[len("route"):])]
+        if self.examples and self.encode is not None:
+            if self.example_vectors is None:
+                vectors = np.vstack([np.asarray(self.encode(text), dtype=np.float32).reshape(1, -1)
+                                     for _, text in self.examples])
+                self.example_vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            vector = np.asarray(self.encode(query), dtype=np.float32).reshape(-1)
+            similarities = self.example_vectors @ (vector / max(np.linalg.norm(vector), 1e-12))
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.similarity:
+                return self.routes[self.example_routes[best]]
+        return None
+
+    def answer(self, query, retrieved_docs, context):
+        """Templated answer for `query`, or None if it needs the summarizer.
+
+        Every call counts towards `stats()`; calls without retrieved chunks are never routed.
+        """
+        with self.lock:
+            self.queries += 1
+        if not retrieved_docs:
+            return None
+        route = self.match(query)
+        if route is None:
+            return None
+        answer = EXTRACTORS[route["extractor"]](route, query, retrieved_docs, context)
+        if answer is not None:
+            with self.lock:
+                self.answered[route["name"]] = self.answered.get(route["name"], 0) + 1
+        return answer
+
+    def count_llm_call(self):
+        with self.lock:
+            self.llm_calls += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "queries": self.queries,
+                "answered_by_intent": dict(self.answered),
+                "llm_calls": self.llm_calls,
+                "non_llm_fraction": 1.0 - self.llm_calls / self.queries if self.queries else 0.0,
+            }
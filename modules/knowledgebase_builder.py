@@ -1,26 +1,32 @@
 import os
 from modules.config_loader import load_config
+from modules.document_store import DocumentStore
+from modules.near_duplicates import NearDuplicateIndex
 
 class KnowledgeBaseBuilder:
     def __init__(self, config):
         self.input_dir = config["scraper"]["output_dir"]
         self.output_dir = config["knowledgebase"]["output_dir"]
         os.makedirs(self.output_dir, exist_ok=True)
+        self.config = config
 
     def build(self):
-        knowledgebase = []
-        for filename in os.listdir(self.input_dir):
-            with open(os.path.join(self.input_dir, filename), "r", encoding="utf-8") as f:
-                content = f.read()
-                knowledgebase.append({"id": filename, "content": content})
-        
-        # Save knowledgebase as JSON
-        import json
-        with open(os.path.join(self.output_dir, "knowledgebase.json"), "w") as f:
-            json.dump(knowledgebase, f)
-        return knowledgebase
+        store = DocumentStore.from_config(self.config)
+        near_duplicates = NearDuplicateIndex.from_config(self.config)
+        # Documents are streamed into the store one at a time instead of collected in memory
+        with store.writer() as writer:
+            for filename in sorted(os.listdir(self.input_dir)):
+                with open(os.path.join(self.input_dir, filename), "r", encoding="utf-8") as f:
+                    content = f.read()
+                    if near_duplicates is not None and near_duplicates.check(filename, content) is not None:
+                        continue
+                    writer.add({"id": filename, "content": content})
+        if near_duplicates is not None:
+            print(f"Collapsed {near_duplicates.collapsed} near-duplicate documents")
+        print(f"Knowledgebase built with {len(store)} documents in {self.output_dir}")
+        return store
 
 if __name__ == "__main__":
     config = load_config()
     builder = KnowledgeBaseBuilder(config)
-    builder.build()
\ No newline at end of file
+    builder.build()
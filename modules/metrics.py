@@ -0,0 +1,213 @@
+import bisect
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans from sub-millisecond cache hits to multi-second summaries
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per-thread list of (stage, seconds) collected by trace()
+_trace = threading.local()
+
+
+def configure_logging(config):
+    """Set up root logging from the `logging` section of config.yml (level, format)."""
+    settings = config.get("logging", {})
+    level = getattr(logging, str(settings.get("level", "INFO")).upper(), logging.INFO)
+    logging.basicConfig(level=level, format=settings.get("format", "%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join('{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                     for key, value in labels)
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        position = bisect.bisect_left(self.buckets, value)
+        if position < len(self.counts):
+            self.counts[position] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield "_bucket", labels + (("le", repr(float(bound))),), cumulative
+        yield "_bucket", labels + (("le", "+Inf"),), self.count
+        yield "_sum", labels, self.sum
+        yield "_count", labels, self.count
+
+
+class Metrics:
+    """Thread-safe counters, gauges and latency histograms, rendered in the Prometheus text format.
+
+    Metrics are created on first use; labels are keyword arguments, e.g.
+    `metrics.inc("rag_requests_total", endpoint="chat", status="ok")`.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.series = {}
+        self.types = {}
+        self.help = {}
+        self.lock = threading.Lock()
+
+    def describe(self, name, kind, text):
+        with self.lock:
+            self.types[name] = kind
+            self.help[name] = text
+
+    def _key(self, name, kind, labels):
+        self.types.setdefault(name, kind)
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, amount=1, **labels):
+        with self.lock:
+            key = self._key(name, "counter", labels)
+            self.series[key] = self.series.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.series[self._key(name, "gauge", labels)] = value
+
+    def observe(self, name, value, **labels):
+        with self.lock:
+            key = self._key(name, "histogram", labels)
+            histogram = self.series.get(key)
+            if histogram is None:
+                histogram = self.series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def render(self):
+        with self.lock:
+            lines = []
+            for name in sorted(self.types):
+                series = sorted((labels, value) for (series_name, labels), value in self.series.items()
+                                if series_name == name)
+                if not series:
+                    continue
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {self.types[name]}")
+                for labels, value in series:
+                    if isinstance(value, Histogram):
+                        for suffix, sample_labels, sample in value.samples(labels):
+                            lines.append(f"{name}{suffix}{_format_labels(sample_labels)} {sample}")
+                    else:
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+            return "\n".join(lines) + "\n"
+
+
+default_metrics = Metrics()
+default_metrics.describe("rag_stage_seconds", "histogram", "Time spent in each stage of answering a query")
+default_metrics.describe("rag_request_seconds", "histogram", "End-to-end request latency")
+default_metrics.describe("rag_requests_total", "counter", "Requests handled, by endpoint and status")
+default_metrics.describe("rag_slow_requests_total", "counter", "Requests slower than metrics.slow_request_ms")
+
+
+@contextmanager
+def span(stage, metrics=None):
+    """Time the enclosed block as `stage` in rag_stage_seconds and in the current request's trace."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        (metrics or default_metrics).observe("rag_stage_seconds", elapsed, stage=stage)
+        stages = getattr(_trace, "stages", None)
+        if stages is not None:
+            stages.append((stage, elapsed))
+
+
+@contextmanager
+def trace():
+    """Collect the (stage, seconds) of every span inside the block on this thread, e.g. for benchmarks."""
+    previous = getattr(_trace, "stages", None)
+    stages = _trace.stages = []
+    try:
+        yield stages
+    finally:
+        _trace.stages = previous
+
+
+class RequestMonitor:
+    """Request counts and latency for flask_api.py, with a hook for looking into slow requests.
+
+    Settings come from the `metrics` section of config.yml:
+    - slow_request_ms: requests at least this slow are logged with their per-stage timings
+    - profile_sample_rate: fraction of requests run under cProfile (one at a time); the
+      profiles of the slow ones are written to profile_dir for `python -m pstats`
+    """
+
+    def __init__(self, config, metrics=None):
+        settings = config.get("metrics", {})
+        self.metrics = metrics or default_metrics
+        slow_ms = settings.get("slow_request_ms", 2000)
+        self.slow_seconds = slow_ms / 1000.0 if slow_ms is not None else None
+        self.sample_rate = settings.get("profile_sample_rate", 0.0)
+        self.profile_dir = settings.get("profile_dir", "data/profiles")
+        # cProfile cannot run in two threads at once
+        self.profile_lock = threading.Lock()
+
+    def _start_profile(self):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        if not self.profile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active in this process
+            self.profile_lock.release()
+            return None
+        return profiler
+
+    def _save_profile(self, profiler, endpoint):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"{endpoint}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof")
+        profiler.dump_stats(path)
+        return path
+
+    @contextmanager
+    def request(self, endpoint):
+        """Measure the enclosed request. Yields a dict whose "status" the caller may set to "error"."""
+        record = {"status": "ok"}
+        profiler = self._start_profile()
+        started = time.perf_counter()
+        try:
+            with trace() as stages:
+                yield record
+        except Exception:
+            record["status"] = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            if profiler is not None:
+                profiler.disable()
+                self.profile_lock.release()
+            self.metrics.inc("rag_requests_total", endpoint=endpoint, status=record["status"])
+            self.metrics.observe("rag_request_seconds", elapsed, endpoint=endpoint)
+            if self.slow_seconds is not None and elapsed >= self.slow_seconds:
+                self.metrics.inc("rag_slow_requests_total", endpoint=endpoint)
+                breakdown = ", ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in stages)
+                logger.warning("Slow %s request: %.1fms (%s)", endpoint, elapsed * 1000, breakdown or "no stages timed")
+                if profiler is not None:
+                    logger.warning("Profile of slow %s request written to %s", endpoint, self._save_profile(profiler, endpoint))
@@ -0,0 +1,103 @@
+import hashlib
+import re
+
+import numpy as np
+
+FINGERPRINT_BITS = 64
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def simhash(text, shingle_size=3):
+    """64-bit SimHash of the word shingles of `text`.
+
+    Pages that differ only by a date, a banner or a few words get fingerprints that
+    differ in only a few bits.
+    """
+    words = _WORD_PATTERN.findall(text.lower())
+    if not words:
+        return 0
+    size = min(shingle_size, len(words))
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(" ".join(words[i:i + size]).encode("utf-8"), digest_size=8).digest(), "little")
+         for i in range(len(words) - size + 1)),
+        dtype=np.uint64,
+    )
+    bits = (hashes[:, None] >> np.arange(FINGERPRINT_BITS, dtype=np.uint64)) & np.uint64(1)
+    votes = bits.sum(axis=0) * 2 > len(hashes)
+    return sum(1 << i for i in np.flatnonzero(votes).tolist())
+
+
+class NearDuplicateIndex:
+    """Finds documents whose SimHash is within a similarity threshold of one already indexed.
+
+    `similarity_threshold` is the fraction of matching fingerprint bits required to call two
+    documents near-duplicates (1.0 only collapses identical fingerprints). Fingerprints are
+    split into one more band than the allowed bit distance, so any near-duplicate shares at
+    least one whole band with its match and only documents in the same band buckets are
+    compared. `collapsed` counts the documents reported as near-duplicates.
+    """
+
+    def __init__(self, similarity_threshold=0.9, shingle_size=3):
+        self.shingle_size = shingle_size
+        self.max_distance = int(round((1.0 - similarity_threshold) * FINGERPRINT_BITS))
+        bands = min(self.max_distance + 1, FINGERPRINT_BITS)
+        width = FINGERPRINT_BITS // bands
+        self.bands = []
+        for b in range(bands):
+            start = b * width
+            end = FINGERPRINT_BITS if b == bands - 1 else start + width
+            self.bands.append((start, (1 << (end - start)) - 1))
+        self.tables = [{} for _ in self.bands]
+        self.fingerprints = {}
+        self.collapsed = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """Build the index from the `dedup` config section, or return None when it is disabled."""
+        dedup = config.get("dedup", {})
+        if not dedup.get("near_duplicates", False):
+            return None
+        return cls(dedup.get("similarity_threshold", 0.9), dedup.get("shingle_size", 3))
+
+    def fingerprint(self, text):
+        return simhash(text, self.shingle_size)
+
+    def find(self, fingerprint, exclude=None):
+        """Return the key of an indexed near-duplicate of `fingerprint`, or None."""
+        checked = set()
+        for (shift, mask), table in zip(self.bands, self.tables):
+            for key in table.get((fingerprint >> shift) & mask, ()):
+                if key == exclude or key in checked:
+                    continue
+                checked.add(key)
+                if bin(fingerprint ^ self.fingerprints[key]).count("1") <= self.max_distance:
+                    return key
+        return None
+
+    def add(self, key, fingerprint):
+        self.remove(key)
+        self.fingerprints[key] = fingerprint
+        for (shift, mask), table in zip(self.bands, self.tables):
+            table.setdefault((fingerprint >> shift) & mask, set()).add(key)
+
+    def remove(self, key):
+        fingerprint = self.fingerprints.pop(key, None)
+        if fingerprint is None:
+            return
+        for (shift, mask), table in zip(self.bands, self.tables):
+            bucket = table.get((fingerprint >> shift) & mask)
+            if bucket:
+                bucket.discard(key)
+
+    def check(self, key, text):
+        """Index `text` under `key` unless it near-duplicates another document.
+
+        Returns the key of the document it duplicates (counting it as collapsed), or None.
+        """
+        fingerprint = self.fingerprint(text)
+        match = self.find(fingerprint, exclude=key)
+        if match is not None:
+            self.collapsed += 1
+            return match
+        self.add(key, fingerprint)
+        return None
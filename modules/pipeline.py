@@ -0,0 +1,442 @@
+import json
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from modules.chunker import Chunker
+from modules.config_loader import load_config
+from modules.document_store import DocumentStore
+from modules.embedding_generator import EmbeddingGenerator, content_hash
+from modules.metrics import configure_logging
+from modules.vector_store import VectorStore
+from modules.web_scraper import WebScraper
+
+# Marks the end of a stage's input; each worker thread of a stage receives one
+STOP = object()
+
+
+class PipelineAborted(Exception):
+    pass
+
+
+class Stage:
+    """One step of the pipeline: `workers` threads taking items from a bounded input queue.
+
+    `handle(item)` returns an iterable of items for the next stage (or None); `finish()`,
+    if given, is called once after the last input item and may return more. Counts, busy
+    time and time spent blocked on a full downstream queue are recorded for the report.
+    """
+
+    def __init__(self, name, handle, workers=1, queue_size=256, finish=None):
+        self.name = name
+        self.handle = handle
+        self.workers = workers
+        self.finish = finish
+        self.input = queue.Queue(queue_size)
+        self.next = None
+        self.items = 0
+        self.produced = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.first_item = None
+        self.last_item = None
+        self.remaining = workers
+        self.lock = threading.Lock()
+
+    def stats(self):
+        active = (self.last_item - self.first_item) if self.first_item is not None else 0.0
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "produced": self.produced,
+            "items_per_second": self.items / active if active > 0 else 0.0,
+            "busy_seconds": self.busy,
+            "blocked_seconds": self.blocked,
+            # Share of the stage's worker time spent working, as opposed to waiting for input or output
+            "utilization": self.busy / (active * self.workers) if active > 0 else 0.0,
+        }
+
+
+class IngestionPipeline:
+    """Crawl, parse, dedup, chunk, embed and index in one run, with the stages overlapping.
+
+    Pages flow through bounded queues from fetch to parse, dedup, chunk, embed and index,
+    each stage in its own thread(s), so the first pages are being embedded while later ones
+    are still downloading and a slow stage holds back the ones before it instead of
+    piling up work in memory. The result is the same set of files the four scripts write:
+    raw pages, crawl manifest and delta, knowledgebase and chunk stores, embeddings, and a
+    newly published vector store version.
+
+    Progress is checkpointed to `pipeline.checkpoint_dir`: the urls already fetched (their
+    raw files and manifest entries are on disk) and every batch of newly encoded
+    embeddings. An interrupted run started again resumes from there: fetched urls are
+    not requested again and chunks already encoded are not re-encoded. The checkpoint is
+    removed once the vector store is published.
+
+    `encoder` replaces the SentenceTransformer, e.g. with a stand-in for offline runs.
+    """
+
+    CHECKPOINT_FILE = "checkpoint.json"
+
+    def __init__(self, config, encoder=None):
+        self.config = config
+        settings = config.get("pipeline", {})
+        self.queue_size = settings.get("queue_size", 256)
+        self.parse_threads = settings.get("parse_threads", 2)
+        self.checkpoint_every = settings.get("checkpoint_every", 100)
+        self.checkpoint_dir = settings.get("checkpoint_dir", "data/pipeline")
+        self.checkpoint_path = os.path.join(self.checkpoint_dir, self.CHECKPOINT_FILE)
+        self.parts_dir = os.path.join(self.checkpoint_dir, "parts")
+
+        self.scraper = WebScraper(config)
+        self.chunker = Chunker(config)
+        self.embedder = EmbeddingGenerator(config, encoder)
+        self.batch_size = self.embedder.batch_size
+        self.dimension = self.embedder.model.get_sentence_embedding_dimension()
+
+        self.failed = threading.Event()
+        self.errors = []
+        self.stages = []
+
+    # Checkpoints
+
+    def _load_checkpoint(self, restart):
+        self.done = {}
+        self.part_vectors = {}
+        self.parts = 0
+        if restart:
+            shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+            self.done = checkpoint["done"]
+            self.scraper.manifest.changed.extend(checkpoint["changed"])
+            self.scraper.manifest.removed.extend(checkpoint["removed"])
+        if os.path.isdir(self.parts_dir):
+            for name in sorted(os.listdir(self.parts_dir)):
+                if not name.endswith("-hashes.npy"):
+                    continue
+                part = name[:-len("-hashes.npy")]
+                hashes = np.load(os.path.join(self.parts_dir, name))
+                vectors = np.load(os.path.join(self.parts_dir, f"{part}-vectors.npy"))
+                self.part_vectors.update(zip(hashes.tolist(), vectors))
+                self.parts += 1
+        if self.done or self.part_vectors:
+            print(f"Resuming: {len(self.done)} urls already fetched, {len(self.part_vectors)} chunks already encoded")
+        os.makedirs(self.parts_dir, exist_ok=True)
+
+    def _save_checkpoint(self):
+        # The manifest first, so every url in the checkpoint has its entry and raw file on disk
+        self.scraper.manifest.save()
+        checkpoint = {"done": self.done, "changed": self.scraper.manifest.changed,
+                      "removed": self.scraper.manifest.removed}
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _save_part(self, hashes, vectors):
+        name = f"{self.parts:06d}"
+        self.parts += 1
+        # Vectors first: a part counts once its hashes file exists
+        for suffix, array in (("vectors", vectors), ("hashes", np.array(hashes, dtype=str))):
+            tmp_path = os.path.join(self.parts_dir, f"{name}-{suffix}.tmp.npy")
+            np.save(tmp_path, array)
+            os.replace(tmp_path, os.path.join(self.parts_dir, f"{name}-{suffix}.npy"))
+
+    # Stages
+
+    def _targets(self):
+        """(url, prefix) pairs to crawl: pages, then articles."""
+        sections = [(self.scraper.pages_config, "max_pages", "page"),
+                    (self.scraper.articles_config, "max_articles", "article")]
+        for section, max_key, prefix in sections:
+            urls = self.scraper.section_urls(section, max_key)
+            if urls is None:
+                continue
+            self.crawled.add(prefix)
+            for url in islice(urls, section[max_key]):
+                if not self.scraper.skip_url(url, prefix):
+                    yield url, prefix
+
+    def _fetch(self, item):
+        seq, url, prefix = item
+        filename = self.done.get(url, "")
+        if filename is None or (filename and os.path.exists(os.path.join(self.scraper.output_dir, filename))):
+            return [(seq, url, prefix, "resumed", self.done[url])]
+        status, result = self.scraper.fetch_page(url)
+        return [(seq, url, prefix, status, result)]
+
+    def _parse(self, item):
+        seq, url, prefix, status, result = item
+        if status == "fetched":
+            try:
+                result["content"] = self.scraper.parse_html(result.pop("html"))
+            except Exception as e:
+                print(f"Error parsing {url}: {e}")
+                status, result = "error", None
+        return [(seq, url, prefix, status, result)]
+
+    def _dedup(self, item):
+        # Pages are handled in crawl order, so duplicate detection keeps the same url a serial crawl would
+        self.reorder[item[0]] = item
+        while self.next_seq in self.reorder:
+            _, url, prefix, status, result = self.reorder.pop(self.next_seq)
+            self.next_seq += 1
+            if status == "resumed":
+                self.scraper.manifest.mark_seen(url)
+                filename = result
+            else:
+                filename = self.scraper.record_result(url, status, result, prefix)
+            # Failed fetches are tried again when resuming
+            if status != "error":
+                self.done[url] = filename
+            self.handled += 1
+            if self.handled % self.checkpoint_every == 0:
+                self._save_checkpoint()
+            if filename is None or filename in self.documents:
+                continue
+            if status == "fetched" and result["content"]:
+                content = result["content"]
+            else:
+                with open(os.path.join(self.scraper.output_dir, filename), "r", encoding="utf-8") as f:
+                    content = f.read()
+            document = {"id": filename, "content": content}
+            self.documents.add(filename)
+            self.document_writer.add(document)
+            yield document
+
+    def _chunk(self, document):
+        for chunk in self.chunker.iter_chunks([document]):
+            self.chunk_writer.add(chunk)
+            yield chunk
+
+    def _embed(self, chunk):
+        self.batch.append(chunk)
+        if len(self.batch) >= self.batch_size:
+            yield self._embed_batch()
+
+    def _embed_rest(self):
+        if self.batch:
+            yield self._embed_batch()
+
+    def _embed_batch(self):
+        batch, self.batch = self.batch, []
+        hashes = [content_hash(chunk["content"]) for chunk in batch]
+        vectors = np.empty((len(batch), self.dimension), dtype=np.float32)
+        missing = []
+        for row, chunk_hash in enumerate(hashes):
+            cached_row = self.cache.get(chunk_hash)
+            if cached_row is not None:
+                vectors[row] = self.cached_vectors[cached_row]
+            elif chunk_hash in self.part_vectors:
+                vectors[row] = self.part_vectors[chunk_hash]
+            else:
+                missing.append(row)
+        if missing:
+            encoded = self.embedder.model.encode([batch[row]["content"] for row in missing],
+                                                 batch_size=self.batch_size, show_progress_bar=False)
+            vectors[missing] = np.asarray(encoded, dtype=np.float32)
+            self._save_part([hashes[row] for row in missing], vectors[missing])
+            self.encoded += len(missing)
+        return [chunk["id"] for chunk in batch], hashes, vectors
+
+    def _index(self, embedded):
+        ids, hashes, vectors = embedded
+        self.vectors_file.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        self.ids.extend(ids)
+        self.hashes.extend(hashes)
+        return None
+
+    # Running
+
+    def _put(self, target, item):
+        while True:
+            if self.failed.is_set():
+                raise PipelineAborted()
+            try:
+                target.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, source):
+        while True:
+            if self.failed.is_set():
+                raise PipelineAborted()
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _emit(self, stage, outputs):
+        for output in outputs or ():
+            stage.produced += 1
+            if stage.next is not None:
+                started = time.perf_counter()
+                self._put(stage.next.input, output)
+                stage.blocked += time.perf_counter() - started
+
+    def _work(self, stage):
+        try:
+            while True:
+                item = self._get(stage.input)
+                if item is STOP:
+                    break
+                started = time.perf_counter()
+                blocked = stage.blocked
+                self._emit(stage, stage.handle(item))
+                finished = time.perf_counter()
+                with stage.lock:
+                    stage.items += 1
+                    stage.busy += finished - started - (stage.blocked - blocked)
+                    if stage.first_item is None:
+                        stage.first_item = started
+                    stage.last_item = finished
+            with stage.lock:
+                stage.remaining -= 1
+                last = stage.remaining == 0
+            if last:
+                if stage.finish is not None:
+                    self._emit(stage, stage.finish())
+                    stage.last_item = time.perf_counter()
+                if stage.next is not None:
+                    for _ in range(stage.next.workers):
+                        self._put(stage.next.input, STOP)
+        except PipelineAborted:
+            pass
+        except BaseException as e:
+            self.errors.append(e)
+            self.failed.set()
+
+    def _feed(self, first):
+        try:
+            for seq, (url, prefix) in enumerate(self._targets()):
+                self._put(first.input, (seq, url, prefix))
+            for _ in range(first.workers):
+                self._put(first.input, STOP)
+        except PipelineAborted:
+            pass
+        except BaseException as e:
+            self.errors.append(e)
+            self.failed.set()
+
+    def stop(self):
+        """Abort a running pipeline; what was checkpointed so far is kept for the next run."""
+        self.failed.set()
+
+    def run(self, restart=False):
+        """Run the whole pipeline and publish the vector store; returns the per-stage stats.
+
+        `restart` discards the checkpoint of an interrupted run instead of resuming it.
+        """
+        self._load_checkpoint(restart)
+        self.crawled = set()
+        self.reorder = {}
+        self.next_seq = 0
+        self.handled = 0
+        self.documents = set()
+        self.batch = []
+        self.ids, self.hashes = [], []
+        self.encoded = 0
+        self.cache, self.cached_vectors = self.embedder.load_cache()
+        self.document_writer = DocumentStore.from_config(self.config).writer()
+        self.chunk_writer = self.chunker.chunk_store.writer()
+        vectors_path = os.path.join(self.checkpoint_dir, "vectors.tmp")
+        self.vectors_file = open(vectors_path, "wb")
+
+        self.stages = [
+            Stage("fetch", self._fetch, self.scraper.workers, self.queue_size),
+            Stage("parse", self._parse, max(1, self.parse_threads), self.queue_size),
+            Stage("dedup", self._dedup, 1, self.queue_size),
+            Stage("chunk", self._chunk, 1, self.queue_size),
+            Stage("embed", self._embed, 1, self.queue_size, finish=self._embed_rest),
+            Stage("index", self._index, 1, self.queue_size),
+        ]
+        for stage, next_stage in zip(self.stages, self.stages[1:]):
+            stage.next = next_stage
+        if self.scraper.parse_workers:
+            self.scraper.parse_pool = ProcessPoolExecutor(max_workers=self.scraper.parse_workers)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=self._feed, args=(self.stages[0],), name="pipeline-feed", daemon=True)]
+        for stage in self.stages:
+            threads.extend(threading.Thread(target=self._work, args=(stage,), name=f"pipeline-{stage.name}-{n}", daemon=True)
+                           for n in range(stage.workers))
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stop()
+            for thread in threads:
+                thread.join()
+            raise
+        finally:
+            if self.scraper.parse_pool is not None:
+                self.scraper.parse_pool.shutdown()
+                self.scraper.parse_pool = None
+            self.vectors_file.close()
+            if self.failed.is_set():
+                self.document_writer.abort()
+                self.chunk_writer.abort()
+                # Every stage has exited, so the urls handled since the last checkpoint can be added
+                self._save_checkpoint()
+                print(f"Pipeline stopped; run it again to resume from {self.checkpoint_dir}")
+        if self.errors:
+            raise self.errors[0]
+        if self.failed.is_set():
+            raise PipelineAborted("Pipeline stopped before finishing")
+
+        self.document_writer.close()
+        self.chunk_writer.close()
+        # Urls of a section that was not crawled are not gone
+        self.scraper.finish_crawl(detect_removed="article" in self.crawled)
+        embeddings_path = self._write_embeddings(vectors_path)
+        del self.cached_vectors
+        self.embedder.save(embeddings_path, self.ids, self.hashes, self.dimension)
+        print(f"Embedded {len(self.ids)} chunks: {self.encoded} encoded, {len(self.ids) - self.encoded} reused")
+        VectorStore(self.config).apply_delta()
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+
+        elapsed = time.perf_counter() - started
+        stats = {"seconds": elapsed, "documents": len(self.documents), "chunks": len(self.ids), "encoded": self.encoded,
+                 "stages": {stage.name: stage.stats() for stage in self.stages}}
+        self.report(stats)
+        return stats
+
+    def _write_embeddings(self, vectors_path):
+        """Turn the raw float32 rows appended by the index stage into an .npy file."""
+        path = os.path.join(self.embedder.output_dir, "embeddings.tmp.npy")
+        header = {"descr": np.lib.format.dtype_to_descr(np.dtype(np.float32)), "fortran_order": False,
+                  "shape": (len(self.ids), self.dimension)}
+        with open(path, "wb") as out, open(vectors_path, "rb") as vectors:
+            np.lib.format.write_array_header_1_0(out, header)
+            shutil.copyfileobj(vectors, out)
+        os.remove(vectors_path)
+        return path
+
+    @staticmethod
+    def report(stats):
+        print(f"Pipeline finished in {stats['seconds']:.1f}s: {stats['documents']} documents, "
+              f"{stats['chunks']} chunks ({stats['encoded']} encoded)")
+        for name, stage in stats["stages"].items():
+            print(f"  {name:<6} workers={stage['workers']:<3} items={stage['items']:<7} "
+                  f"{stage['items_per_second']:9.1f} items/s  utilization={stage['utilization']:6.1%}  "
+                  f"blocked on next stage={stage['blocked_seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    config = load_config()
+    configure_logging(config)
+    # --restart ignores the checkpoint of an interrupted run and starts from scratch
+    IngestionPipeline(config).run(restart="--restart" in sys.argv[1:])
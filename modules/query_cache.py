@@ -0,0 +1,162 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s%.]|(?<!\d)\.|\.(?!\d)")
+
+
+def normalize_query(query):
+    """Lowercase, drop punctuation (keeping decimals and %) and collapse whitespace."""
+    return " ".join(PUNCTUATION_PATTERN.sub(" ", query.lower()).split())
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used entry.
+
+    A `max_size` of 0 disables the cache: every lookup is a miss and nothing is stored.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class SemanticCache(LRUCache):
+    """LRU answer cache looked up by embedding similarity rather than exact key.
+
+    Embeddings are L2-normalized into a fixed (max_size, dimension) matrix, so a lookup is
+    one matrix-vector product. An entry is reused when its cosine similarity to the query
+    is at least `threshold` and it was stored for the same index `version`; entries from an
+    older version are never returned and are dropped when the first new answer is stored.
+    """
+
+    def __init__(self, max_size, threshold=0.95):
+        super().__init__(max_size)
+        self.threshold = threshold
+        self.vectors = None
+        self.version = None
+        # slot -> value in LRU order; free slots are reused before evicting
+        self.free_slots = []
+
+    def _reset(self, dimension, version):
+        self.vectors = np.zeros((self.max_size, dimension), dtype=np.float32)
+        self.free_slots = list(range(self.max_size - 1, -1, -1))
+        self.entries.clear()
+        self.version = version
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, embedding, version):
+        with self.lock:
+            if not self.entries or version != self.version:
+                self.misses += 1
+                return None
+            slots = np.fromiter(self.entries.keys(), dtype=np.int64, count=len(self.entries))
+            similarities = self.vectors[slots] @ self._normalize(embedding)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            slot = int(slots[best])
+            self.entries.move_to_end(slot)
+            self.hits += 1
+            return self.entries[slot]
+
+    def put(self, embedding, version, value):
+        if self.max_size <= 0:
+            return
+        vector = self._normalize(embedding)
+        with self.lock:
+            if self.vectors is None or version != self.version or self.vectors.shape[1] != len(vector):
+                self._reset(len(vector), version)
+            if self.free_slots:
+                slot = self.free_slots.pop()
+            else:
+                slot, _ = self.entries.popitem(last=False)
+                self.evictions += 1
+            self.vectors[slot] = vector
+            self.entries[slot] = value
+
+    def clear(self):
+        with self.lock:
+            self.vectors = None
+            self.version = None
+            self.entries.clear()
+
+    def stats(self):
+        stats = super().stats()
+        stats["threshold"] = self.threshold
+        return stats
+
+
+class QueryCache:
+    """The query caches used by RAGModel, sized from the `cache` section of config.yml.
+
+    - embeddings: normalized query -> query embedding
+    - retrievals: (normalized query, index version) -> retrieved chunks
+    - answers: semantic cache of generated answers, see SemanticCache
+    """
+
+    def __init__(self, config):
+        settings = config.get("cache", {})
+        self.embeddings = LRUCache(settings.get("embedding_size", 1024))
+        self.retrievals = LRUCache(settings.get("retrieval_size", 1024))
+        self.answers = SemanticCache(settings.get("answer_size", 512), settings.get("answer_similarity", 0.95))
+
+    def clear(self):
+        self.embeddings.clear()
+        self.retrievals.clear()
+        self.answers.clear()
+
+    def stats(self):
+        return {
+            "embeddings": self.embeddings.stats(),
+            "retrievals": self.retrievals.stats(),
+            "answers": self.answers.stats(),
+        }
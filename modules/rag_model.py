@@ -1,62 +1,148 @@
+import logging
 import numpy as np
-import json
-import os
-from sentence_transformers import SentenceTransformer
-from transformers import pipeline
-from modules.vector_store import VectorStore
+from modules.bm25 import reciprocal_rank_fusion, tokenize
+from modules.query_cache import QueryCache, normalize_query
+from modules.batcher import DenseSearch
+from modules.intent_router import IntentRouter
+from modules import registry
+from modules.document_store import DocumentIndex, DocumentStore
 from modules.config_loader import load_config
+from modules.metrics import configure_logging, span
 import re
 
+logger = logging.getLogger(__name__)
+
 class RAGModel:
     def __init__(self, config):
+        self.config = config
+        # Models and the vector store are shared per process and loaded on first use, see modules/registry.py
         self.model_name = config["embeddings"]["model"]
-        self.model = SentenceTransformer(self.model_name)
-        self.vector_store = VectorStore(config)
-        self.input_dir = config["knowledgebase"]["output_dir"]
+        # Encode + FAISS search, micro-batched across concurrent requests if serving.batching is on
+        self.dense = DenseSearch(config)
+        # Retrieval works on chunks; each keeps its parent doc_id and offsets
+        self.store = DocumentStore.chunks_from_config(config)
+        self.input_dir = self.store.root
+        # Loaded once and memory-mapped; reloaded only when a new knowledgebase version is written
+        self.documents = DocumentIndex(self.store, config["knowledgebase"].get("reload_interval", 5))
         self.chunk_size = config["rag"]["chunk_size"]
         self.top_k = config["rag"]["top_k"]
-        # Initialize BART for summarization
+        retrieval = config["rag"].get("retrieval", {})
+        self.retrieval_mode = retrieval.get("mode", "hybrid")
+        self.rrf_k = retrieval.get("rrf_k", 60)
+        self.cache = QueryCache(config)
+        # Templated intents answered without the LLM; example embeddings are computed on first use
+        self.router = IntentRouter.from_config(config, self.embed_query)
+        self.llm_failed = False
+
+    @property
+    def model(self):
+        return registry.sentence_transformer(self.model_name)
+
+    @property
+    def vector_store(self):
+        return registry.vector_store(self.config)
+
+    @property
+    def llm(self):
+        """Summarizer for open questions (model, backend and batching from config.yml), or None if it failed to load."""
+        if self.llm_failed:
+            return None
         try:
-            # self.llm = pipeline("summarization", model="facebook/bart-large-cnn", max_length=100)
-            self.llm = pipeline("summarization", model="sshleifer/distilbart-cnn-12-6", max_length=100)
+            return registry.summary_generator(self.config)
         except Exception as e:
-            print(f"Error loading LLM: {e}")
-            self.llm = None
+            logger.error("Error loading LLM: %s", e)
+            self.llm_failed = True
+            return None
+
+    def warm_up(self, llm=True):
+        """Load the encoder, vector store, chunk index and (optionally) the summarizer now
+        rather than on the first request; returns per-component load times."""
+        self.embed_query("warm up")
+        if self.index_version() is None or self.load_knowledgebase() is None:
+            raise RuntimeError("vector store or knowledgebase is not available")
+        if llm:
+            self.llm
+        return registry.default_registry.stats()
 
     def load_knowledgebase(self):
+        self.documents.maybe_reload()
+        if self.documents.version is None:
+            logger.error("Knowledgebase index not found in %s", self.input_dir)
+            return None
+        return self.documents
+
+    def embed_query(self, query):
+        """Embedding of the normalized query, encoded once per distinct query."""
+        normalized = normalize_query(query)
+        embedding = self.cache.embeddings.get(normalized)
+        if embedding is None:
+            with span("encode"):
+                embedding = self.dense.encode(normalized)
+            self.cache.embeddings.put(normalized, embedding)
+        return embedding
+
+    def index_version(self):
+        """Versions of the vector store and chunk store that retrieval results depend on."""
         try:
-            with open(os.path.join(self.input_dir, "knowledgebase.json"), "r") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            print(f"Error: knowledgebase.json not found in {self.input_dir}.")
-            return []
+            self.vector_store.ensure_loaded()
+            self.documents.maybe_reload()
+        except Exception as e:
+            logger.error("Error loading the index: %s", e)
+            return None
+        return self.vector_store.version, self.documents.version
 
-    def retrieve(self, query):
+    def retrieve(self, query, query_embedding=None):
+        """Chunks for `query`; `query_embedding` overrides the embedding of the query text,
+        e.g. with the history-weighted one from ContextBuilder."""
         try:
-            query_embedding = self.model.encode([query], show_progress_bar=False)
+            cache_key = (normalize_query(query), self.index_version())
+            cached = self.cache.retrievals.get(cache_key)
+            if cached is not None:
+                return cached
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
             # Increase top_k for services query
             search_k = self.top_k * 3 if "services" in query.lower() else self.top_k * 2
-            results = self.vector_store.search(query_embedding, search_k)
+            with span("faiss_search"):
+                found = self.dense.search(query_embedding, search_k)
+            dense = [(doc_id, distance) for doc_id, distance in found if distance <= 1.0]
             knowledgebase = self.load_knowledgebase()
+            if knowledgebase is None:
+                return []
+            with span("lexical"):
+                if self.retrieval_mode == "hybrid":
+                    # Dense and BM25 rankings fused in one stage; a chunk either retriever ranks well survives
+                    lexical = self.vector_store.search_lexical(query, search_k)
+                    ranked = [doc_id for doc_id, _ in reciprocal_rank_fusion([dense, lexical], self.rrf_k)]
+                else:
+                    query_keywords = set(tokenize(query))
+                    ranked = [doc_id for doc_id, _ in dense
+                              if not query_keywords.isdisjoint(knowledgebase.tokens(doc_id))]
+            distances = dict(dense)
             retrieved_docs = []
-            query_keywords = set(query.lower().split())
-
-            for doc_id, distance in results:
-                if distance > 1.0:
-                    continue
-                for item in knowledgebase:
-                    if item["id"] == doc_id:
-                        content = item["content"].lower()
-                        if any(keyword in content for keyword in query_keywords):
-                            retrieved_docs.append({"id": doc_id, "content": item["content"], "distance": distance})
+            with span("doc_lookup"):
+                for doc_id in ranked:
+                    item = knowledgebase.get(doc_id)
+                    if item is not None:
+                        retrieved_docs.append({
+                            "id": doc_id,
+                            "doc_id": item["doc_id"],
+                            "start": item["start"],
+                            "end": item["end"],
+                            "content": item["content"],
+                            "distance": distances.get(doc_id),
+                        })
+                    if len(retrieved_docs) >= self.top_k:
                         break
-            print(f"Debug: Retrieved docs for query '{query}': {[doc['id'] for doc in retrieved_docs]}")
-            for doc in retrieved_docs:
-                snippet = doc["content"][:200] + "..." if len(doc["content"]) > 200 else doc["content"]
-                print(f"Debug: Content of {doc['id']}: {snippet}")
-            return retrieved_docs[:self.top_k]
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Retrieved docs for query %r: %s", query, [doc["id"] for doc in retrieved_docs])
+                for doc in retrieved_docs:
+                    snippet = doc["content"][:200] + "..." if len(doc["content"]) > 200 else doc["content"]
+                    logger.debug("Content of %s: %s", doc["id"], snippet)
+            self.cache.retrievals.put(cache_key, retrieved_docs)
+            return retrieved_docs
         except Exception as e:
-            print(f"Error in retrieval for query '{query}': {e}")
+            logger.exception("Error in retrieval for query %r: %s", query, e)
             return []
 
     def clean_context(self, context):
@@ -73,95 +159,108 @@ class RAGModel:
         cleaned = re.sub(r'\s+', ' ', cleaned).strip()
         return cleaned
 
-    def summarize_context(self, retrieved_docs, query):
-        if not retrieved_docs:
-            return "No relevant information found. Please check the official website for details."
-
-        query_lower = query.lower()
-        context = " ".join(doc["content"][:self.chunk_size] for doc in retrieved_docs)
+    def prepare_response(self, retrieved_docs, query):
+        """Return (response, None) when no LLM call is needed, else (None, summarizer prompt)."""
+        # Retrieved chunks are already at most chunk_size characters
+        context = " ".join(doc["content"] for doc in retrieved_docs)
         cleaned_context = self.clean_context(context)
 
-        # Handle "documents required for gold loan" queries
-        if "documents" in query_lower and "gold loan" in query_lower:
-            doc_list = set()
-            for doc in retrieved_docs:
-                content_lower = doc["content"].lower()
-                if "identity proof" in content_lower:
-                    doc_list.add("Identity Proof (e.g., Aadhaar Card, Passport, Voter ID, Driving License, or PAN Card; Form 60 if no PAN Card)")
-                if "address proof" in content_lower:
-                    doc_list.add("Address Proof (e.g., Aadhaar Card, Passport, Voter ID, Utility Bills, Gas Connection Card)")
-                if "photo" in content_lower:
-                    doc_list.add("Recent passport-size photos")
-                if "income" in content_lower or "salary" in content_lower:
-                    doc_list.add("Proof of income (optional, e.g., salary slips, bank statements)")
-
-            print(f"Debug: doc_list = {list(doc_list)}")
-
-            if doc_list:
-                try:
-                    return (
-                        "The documents required for a gold loan include:\n- "
-                        + "\n- ".join(sorted(doc_list))
-                        + "\nNote: Requirements may vary; contact the official provider for specifics."
-                    )
-                except TypeError as e:
-                    print(f"Error in joining doc_list: {e}")
-                    return "Documents for a gold loan typically include identity and address proofs. Please check with the official provider for details."
-            return "Documents for a gold loan typically include identity and address proofs. Please check with the official provider for the exact list."
-
-        # Handle "interest rate" queries
-        if "interest rate" in query_lower and "fixed deposit" in query_lower:
-            rates = re.findall(r'(\d+\.\d{1,2}%)\s*(?:p\.a\.|per\s*annum|percent|annual)?', cleaned_context, re.IGNORECASE)
-            filtered_rates = [rate for rate in rates if 5.0 <= float(rate.split('%')[0]) <= 10.0]
-            if filtered_rates:
-                unique_rates = sorted(set(filtered_rates))
-                print(f"Debug: Extracted rates: {unique_rates}")
-                return f"The interest rates for fixed deposits are approximately {', '.join(unique_rates)}."
-            print("Debug: No interest rates found in context. Context sample: ", cleaned_context[:1000])
-            return "Fixed deposit interest rates vary based on tenure and amount. Please check the official website for current rates."
-
-        # Hardcoded summaries for general queries
-        if "what is a gold loan" in query_lower:
-            if any("gold loan" in doc["content"].lower() for doc in retrieved_docs):
-                return "A gold loan is a secured loan where you pledge gold jewellery as collateral to obtain funds, offering quick disbursal, low interest rates starting from 10% p.a., and flexible repayment options."
-        if "what is a two-wheeler loan" in query_lower:
-            if any("two-wheeler loan" in doc["content"].lower() for doc in retrieved_docs):
-                return "A two-wheeler loan finances the purchase of a motorcycle or scooter, providing low interest rates starting from 10% p.a., up to 100% financing, and quick disbursal within 24 hours."
-        if "what is a fixed investment plan" in query_lower:
-            if any("fixed investment plan" in doc["content"].lower() for doc in retrieved_docs):
-                return "A fixed investment plan combines fixed returns with a flexible monthly savings plan, starting at ₹1,000 per month, with interest rates up to 9.10% p.a. and tenures from 23 to 59 months."
-        if "services offered" in query_lower:
-            if any("products" in doc["id"].lower() or "services" in doc["content"].lower() for doc in retrieved_docs):
-                return "Shriram Finance offers services including gold loans, two-wheeler loans, fixed deposits, fixed investment plans, and insurance."
+        # Templated intents (document lists, rates, product definitions) are answered from
+        # the retrieved chunks by the intent router configured in config.yml
+        with span("intent_routing"):
+            response = self.router.answer(query, retrieved_docs, cleaned_context)
+        if response is not None:
+            return response, None
+        if not retrieved_docs:
+            return "No relevant information found. Please check the official website for details.", None
+        if not self.llm:
+            return "No specific information found. Please check the official website for details.", None
 
         # Use BART for other general queries
-        if self.llm:
-            try:
-                # Refined prompt for summarization
-                prompt = f"Summarize the answer to '{query}' in 2-3 concise sentences using this context:\n{cleaned_context[:500]}"
-                response = self.llm(prompt, max_length=100, min_length=30, do_sample=False)[0]["summary_text"]
-                # Ensure response is relevant
-                if any(keyword in response.lower() for keyword in query_lower.split()):
-                    return response
-                return "Based on the available information, please check the official website for more details."
-            except Exception as e:
-                print(f"Error generating LLM response: {e}")
-                return "Unable to generate response. Please check the official website for details."
-        else:
-            return "No specific information found. Please check the official website for details."
+        self.router.count_llm_call()
+        # Refined prompt for summarization
+        return None, f"Summarize the answer to '{query}' in 2-3 concise sentences using this context:\n{cleaned_context[:500]}"
+
+    def summarize_context(self, retrieved_docs, query):
+        response, prompt = self.prepare_response(retrieved_docs, query)
+        if prompt is None:
+            return response
+        try:
+            with span("summarize"):
+                response = self.llm.summarize(prompt)
+            # Ensure response is relevant
+            if any(keyword in response.lower() for keyword in query.lower().split()):
+                return response
+            return "Based on the available information, please check the official website for more details."
+        except Exception as e:
+            logger.error("Error generating LLM response: %s", e)
+            return "Unable to generate response. Please check the official website for details."
 
     def generate_response(self, query, retrieved_docs):
         response = self.summarize_context(retrieved_docs, query)
-        print(f"Debug: Generated response for '{query}': {response[:200]}...")
+        logger.debug("Generated response for %r: %s", query, response[:200])
         return response
 
-    def answer_query(self, query):
-        print(f"Debug: Clearing context for new query '{query}'")
-        retrieved_docs = self.retrieve(query)
-        return self.generate_response(query, retrieved_docs)
+    def retrieval_inputs(self, query, context=None):
+        """(retrieval query, query embedding) for `query`, taken from `context` when given."""
+        retrieval_query, query_embedding = query, None
+        if context is not None:
+            retrieval_query, query_embedding = context["query"], context["embedding"]
+        if query_embedding is None:
+            query_embedding = self.embed_query(retrieval_query)
+        return retrieval_query, query_embedding
+
+    def answer_query(self, query, context=None):
+        """Answer `query`; `context` from ContextBuilder.build_context supplies the retrieval
+        query and embedding for a conversation, the answer is still generated for `query`."""
+        retrieval_query, query_embedding = self.retrieval_inputs(query, context)
+        # A close enough earlier query against the same index versions gets the same answer
+        version = self.index_version()
+        response = self.cache.answers.get(query_embedding, version)
+        if response is not None:
+            return response
+        retrieved_docs = self.retrieve(retrieval_query, query_embedding)
+        response = self.generate_response(query, retrieved_docs)
+        if retrieved_docs:
+            self.cache.answers.put(query_embedding, version, response)
+        return response
+
+    def answer_query_stream(self, query, context=None):
+        """Like answer_query, but yields the answer in pieces while the summarizer generates it.
+
+        Templated and cached answers arrive as a single piece. Streamed summaries skip the
+        relevance check of summarize_context, since their text has already been sent.
+        """
+        retrieval_query, query_embedding = self.retrieval_inputs(query, context)
+        version = self.index_version()
+        response = self.cache.answers.get(query_embedding, version)
+        if response is not None:
+            yield response
+            return
+        retrieved_docs = self.retrieve(retrieval_query, query_embedding)
+        response, prompt = self.prepare_response(retrieved_docs, query)
+        if prompt is None:
+            yield response
+        else:
+            pieces = []
+            try:
+                # Includes the time the client takes to receive each piece
+                with span("summarize"):
+                    for piece in self.llm.stream(prompt):
+                        pieces.append(piece)
+                        yield piece
+            except Exception as e:
+                logger.error("Error generating LLM response: %s", e)
+                if not pieces:
+                    yield "Unable to generate response. Please check the official website for details."
+                return
+            response = "".join(pieces)
+        if retrieved_docs:
+            self.cache.answers.put(query_embedding, version, response)
 
 if __name__ == "__main__":
     config = load_config()
+    configure_logging(config)
     rag = RAGModel(config)
     queries = [
         "What is the interest rate of fixed deposit",
@@ -0,0 +1,94 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Process-wide cache of expensive resources (models, indexes), created on first use.
+
+    `get(key, factory, warmup)` returns the instance for `key`, calling `factory()` only the
+    first time; concurrent callers for the same key wait for that one load instead of
+    loading their own copy. An optional `warmup(instance)` runs once after loading, e.g. a
+    dummy inference so the first real request does not pay for lazy initialisation.
+    Load and warm-up times are recorded per key.
+    """
+
+    def __init__(self):
+        self.instances = {}
+        self.key_locks = {}
+        self.timings = {}
+        self.lock = threading.Lock()
+
+    def get(self, key, factory, warmup=None):
+        instance = self.instances.get(key)
+        if instance is not None:
+            return instance
+        with self.lock:
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            instance = self.instances.get(key)
+            if instance is not None:
+                return instance
+            started = time.perf_counter()
+            instance = factory()
+            timing = {"load_seconds": time.perf_counter() - started}
+            if warmup is not None:
+                started = time.perf_counter()
+                warmup(instance)
+                timing["warmup_seconds"] = time.perf_counter() - started
+            logger.info("Loaded %s in %.2fs%s", key, timing["load_seconds"],
+                        f" (warm-up {timing['warmup_seconds']:.2f}s)" if warmup is not None else "")
+            with self.lock:
+                self.timings[key] = timing
+            self.instances[key] = instance
+            return instance
+
+    def peek(self, key):
+        """The instance for `key` if it has already been loaded, else None; never loads it."""
+        return self.instances.get(key)
+
+    def stats(self):
+        with self.lock:
+            return {key: dict(timing) for key, timing in self.timings.items()}
+
+
+default_registry = ModelRegistry()
+
+
+def sentence_transformer(model_name):
+    """The shared SentenceTransformer for `model_name`."""
+    def load():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+
+    return default_registry.get(f"sentence_transformer:{model_name}", load,
+                                lambda model: model.encode(["warm up"], show_progress_bar=False))
+
+
+def _summary_generator_key(config):
+    settings = config.get("generator", {})
+    return f"generator:{settings.get('model')}:{settings.get('backend', 'torch')}"
+
+
+def summary_generator(config):
+    """The shared SummaryGenerator for the `generator` section of `config`."""
+    from modules.generator import SummaryGenerator
+
+    return default_registry.get(_summary_generator_key(config), lambda: SummaryGenerator(config),
+                                lambda generator: generator.generate(["warm up"]))
+
+
+def loaded_summary_generator(config):
+    """The shared SummaryGenerator if it has already been loaded, else None (e.g. for /stats)."""
+    return default_registry.peek(_summary_generator_key(config))
+
+
+def vector_store(config):
+    """The shared read-only VectorStore for `vector_store.output_dir`, with its published
+    version loaded (memory-mapped unless `vector_store.mmap` is false)."""
+    from modules.vector_store import VectorStore
+
+    key = f"vector_store:{config['vector_store']['output_dir']}"
+    return default_registry.get(key, lambda: VectorStore(config, read_only=True), lambda store: store.ensure_loaded())
@@ -0,0 +1,200 @@
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class MemorySessionStore:
+    """Conversation history per session_id, kept in this process.
+
+    At most `max_sessions` sessions are kept; the least recently used one is evicted to
+    make room, and sessions idle for longer than `ttl_seconds` are dropped. Each session
+    keeps its last `max_turns` interactions, so memory is bounded by
+    max_sessions * max_turns regardless of how many session ids are seen.
+    """
+
+    def __init__(self, max_sessions=10000, ttl_seconds=1800, max_turns=5):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        # session_id -> (last access, [interactions]), least recently used first
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+        self.evictions = 0
+
+    def _evict(self, now):
+        while self.sessions:
+            session_id, (last_access, _) = next(iter(self.sessions.items()))
+            if len(self.sessions) <= self.max_sessions and now - last_access <= self.ttl_seconds:
+                break
+            del self.sessions[session_id]
+            self.evictions += 1
+
+    def get(self, session_id):
+        """Interactions of `session_id`, oldest first."""
+        now = time.time()
+        with self.lock:
+            self._evict(now)
+            entry = self.sessions.get(session_id)
+            if entry is None:
+                return []
+            self.sessions[session_id] = (now, entry[1])
+            self.sessions.move_to_end(session_id)
+            return list(entry[1])
+
+    def append(self, session_id, interaction):
+        now = time.time()
+        with self.lock:
+            entry = self.sessions.pop(session_id, None)
+            history = entry[1] if entry else []
+            history.append(interaction)
+            self.sessions[session_id] = (now, history[-self.max_turns:])
+            self._evict(now)
+
+    def clear(self, session_id):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def stats(self):
+        return {"backend": "memory", "sessions": len(self.sessions), "evictions": self.evictions}
+
+
+class SQLiteSessionStore:
+    """Conversation history per session_id in a SQLite file shared by worker processes.
+
+    Same bounds as MemorySessionStore. Every read-modify-write runs in an IMMEDIATE
+    transaction, so concurrent threads and processes see consistent histories. Expired and
+    over-limit sessions are deleted every `prune_every` writes instead of on each one.
+    Histories are stored as JSON with query embeddings as base64 float32 bytes rather than
+    lists of floats, and come back as float32 arrays.
+    """
+
+    def __init__(self, path, max_sessions=10000, ttl_seconds=1800, max_turns=5, prune_every=100):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self.prune_every = prune_every
+        self.writes = 0
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(session_id TEXT PRIMARY KEY, history TEXT NOT NULL, updated REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated)")
+
+    def _connect(self):
+        # sqlite3 connections must not be shared between threads; keep one per thread
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return _Transaction(connection)
+
+    def get(self, session_id):
+        now = time.time()
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT history, updated FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None:
+                return []
+            if now - row[1] > self.ttl_seconds:
+                connection.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                return []
+            connection.execute("UPDATE sessions SET updated = ? WHERE session_id = ?", (now, session_id))
+            return _decode_history(row[0])
+
+    def append(self, session_id, interaction):
+        now = time.time()
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT history, updated FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            # Earlier turns stay encoded; only the new one is converted
+            history = json.loads(row[0]) if row and now - row[1] <= self.ttl_seconds else []
+            history.append(_encode_interaction(interaction))
+            connection.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, history, updated) VALUES (?, ?, ?)",
+                (session_id, json.dumps(history[-self.max_turns:]), now))
+            self.writes += 1
+            if self.writes % self.prune_every == 0:
+                self._prune(connection, now)
+
+    def _prune(self, connection, now):
+        connection.execute("DELETE FROM sessions WHERE updated < ?", (now - self.ttl_seconds,))
+        connection.execute(
+            "DELETE FROM sessions WHERE session_id IN "
+            "(SELECT session_id FROM sessions ORDER BY updated DESC LIMIT -1 OFFSET ?)", (self.max_sessions,))
+
+    def clear(self, session_id):
+        with self._connect() as connection:
+            connection.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def __len__(self):
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def stats(self):
+        return {"backend": "sqlite", "path": self.path, "sessions": len(self)}
+
+
+def _encode_interaction(interaction):
+    embedding = interaction.get("embedding")
+    if embedding is None or isinstance(embedding, str):
+        return interaction
+    raw = np.asarray(embedding, dtype=np.float32).tobytes()
+    return dict(interaction, embedding=base64.b64encode(raw).decode("ascii"))
+
+
+def _decode_history(text):
+    history = json.loads(text)
+    for interaction in history:
+        embedding = interaction.get("embedding")
+        if isinstance(embedding, str):
+            interaction["embedding"] = np.frombuffer(base64.b64decode(embedding), dtype=np.float32)
+        elif embedding is not None:
+            # Written as a list of floats by earlier versions
+            interaction["embedding"] = np.asarray(embedding, dtype=np.float32)
+    return history
+
+
+class _Transaction:
+    """`with` block running an IMMEDIATE transaction on a connection in autocommit mode."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def session_store_from_config(config):
+    """Session store described by `chatbot.sessions` in config.yml (in-process by default)."""
+    chatbot = config["chatbot"]
+    settings = chatbot.get("sessions", {})
+    backend = settings.get("backend", "memory")
+    options = {
+        "max_sessions": settings.get("max_sessions", 10000),
+        "ttl_seconds": settings.get("ttl_seconds", 1800),
+        "max_turns": chatbot["context_window"],
+    }
+    if backend == "memory":
+        return MemorySessionStore(**options)
+    if backend == "sqlite":
+        return SQLiteSessionStore(settings.get("sqlite_path", "data/sessions.db"), **options)
+    raise ValueError(f"Unknown session backend {backend!r}; expected memory or sqlite")
@@ -0,0 +1,132 @@
+import logging
+import queue
+import threading
+import xml.etree.ElementTree as ET
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+class SitemapReader:
+    """Streams page urls out of sitemaps and nested sitemap indexes.
+
+    Each sitemap is parsed incrementally from the response stream (gunzipped when it is a
+    `.xml.gz` file), so memory does not grow with the sitemap size. Nested sitemaps found in
+    an index are fetched concurrently by `workers` threads, and urls are yielded as soon as
+    they are parsed, so a consumer can start scraping while discovery is still running.
+
+    `open_stream(url)` must return a streaming `requests` response for `url`. Sitemaps that
+    could not be fetched or parsed are logged and collected in `failures` as (url, error),
+    so callers can tell an incomplete url list from a complete one.
+    """
+
+    def __init__(self, open_stream, workers=4, queue_size=10000):
+        self.open_stream = open_stream
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.failures = []
+
+    def iter_urls(self, sitemap_urls):
+        urls = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        lock = threading.Lock()
+        visited = set()
+        pending = [0]
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        def put(item):
+            # Give up once the consumer has stopped iterating instead of blocking forever
+            while not stop.is_set():
+                try:
+                    urls.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def submit(sitemap_url):
+            with lock:
+                if sitemap_url in visited:
+                    return
+                visited.add(sitemap_url)
+                pending[0] += 1
+            executor.submit(work, sitemap_url)
+
+        def work(sitemap_url):
+            try:
+                self._read(sitemap_url, submit, put, stop)
+            except Exception as e:
+                # Reads cut short because the consumer stopped iterating are not failures
+                if not stop.is_set():
+                    logger.error("Error reading sitemap %s: %s", sitemap_url, e)
+                    with lock:
+                        self.failures.append((sitemap_url, str(e)))
+            finally:
+                with lock:
+                    pending[0] -= 1
+                    finished = pending[0] == 0
+                if finished:
+                    put(_DONE)
+
+        with lock:
+            pending[0] += 1
+        try:
+            for sitemap_url in sitemap_urls:
+                submit(sitemap_url)
+        finally:
+            with lock:
+                pending[0] -= 1
+                finished = pending[0] == 0
+            if finished:
+                put(_DONE)
+
+        try:
+            while True:
+                url = urls.get()
+                if url is _DONE:
+                    return
+                yield url
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _read(self, sitemap_url, submit, put, stop):
+        response = self.open_stream(sitemap_url)
+        try:
+            parser = ET.XMLPullParser(events=("start", "end"))
+            decompressor = None
+            root = None
+            is_index = False
+            # iter_content already undoes Content-Encoding; .xml.gz files are gunzipped here
+            for i, chunk in enumerate(response.iter_content(chunk_size=64 * 1024)):
+                if stop.is_set():
+                    return
+                if i == 0 and chunk[:2] == b"\x1f\x8b":
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                parser.feed(decompressor.decompress(chunk) if decompressor else chunk)
+                for event, elem in parser.read_events():
+                    if event == "start":
+                        if root is None:
+                            root = elem
+                            is_index = _local_name(elem.tag) == "sitemapindex"
+                        continue
+                    name = _local_name(elem.tag)
+                    if name == "loc" and elem.text:
+                        loc = elem.text.strip()
+                        if is_index:
+                            submit(loc)
+                        elif not put(loc):
+                            return
+                    elif name in ("url", "sitemap"):
+                        # Drop finished entries so the parsed tree never holds the whole sitemap
+                        root.clear()
+            parser.close()
+        finally:
+            response.close()
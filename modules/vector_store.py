@@ -1,59 +1,424 @@
 import faiss
+import logging
 import numpy as np
 import os
+import json
+import shutil
+import sys
+import threading
+import time
 from modules.config_loader import load_config
+from modules.bm25 import BM25Index, FrozenBM25Index
+from modules.document_store import DocumentStore
+from modules.embedding_files import load_embeddings, load_hashes
+from modules.metrics import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# faiss index_factory descriptions for the supported `vector_store.index.type` values
+INDEX_TYPES = {
+    "flat": lambda c: "Flat",
+    "ivf": lambda c: f"IVF{c['nlist']},Flat",
+    "hnsw": lambda c: f"HNSW{c['hnsw_m']}",
+    "pq": lambda c: f"PQ{c['pq_m']}x{c['pq_nbits']}",
+    "ivfpq": lambda c: f"IVF{c['nlist']},PQ{c['pq_m']}x{c['pq_nbits']}",
+    "sq8": lambda c: "SQ8",
+    "sq16": lambda c: "SQfp16",
+    "ivfsq8": lambda c: f"IVF{c['nlist']},SQ8",
+    "hnswsq8": lambda c: f"HNSW{c['hnsw_m']}_SQ8",
+}
+
+INDEX_DEFAULTS = {
+    "type": "flat",
+    "nlist": 1024,         # IVF: number of inverted lists
+    "nprobe": 16,          # IVF: lists visited per query
+    "hnsw_m": 32,          # HNSW: neighbours per node
+    "ef_construction": 200,
+    "ef_search": 64,       # HNSW: candidate list size per query
+    "pq_m": 16,            # PQ: sub-quantizers, must divide the dimension
+    "pq_nbits": 8,
+    "train_size": 100000,  # vectors sampled to train IVF/PQ/SQ indexes
+}
+
+
+def index_settings(config):
+    settings = dict(INDEX_DEFAULTS)
+    settings.update(config["vector_store"].get("index", {}))
+    return settings
+
+
+def create_index(settings, vectors, labels=None):
+    """Create, train and fill the index described by `settings` with `vectors`.
+
+    With `labels` each vector is stored under its int64 label, so single vectors can later be
+    removed or replaced. IVF indexes keep the labels in their inverted lists; the others are
+    wrapped in an IndexIDMap2. IVF must not be wrapped: its remove_ids leaves the other
+    vectors' ids in place, while IndexIDMap2 compacts its id map as if they had shifted.
+    """
+    index_type = settings["type"].lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{settings['type']}', expected one of {sorted(INDEX_TYPES)}")
+    count, dimension = vectors.shape
+    # IVF needs roughly 39 training points per list; shrink nlist for small corpora
+    settings = dict(settings, nlist=max(1, min(settings["nlist"], count // 39)))
+    index = faiss.index_factory(dimension, INDEX_TYPES[index_type](settings), faiss.METRIC_L2)
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efConstruction = settings["ef_construction"]
+    if not index.is_trained:
+        sample = vectors
+        if count > settings["train_size"]:
+            rows = np.sort(np.random.default_rng(0).choice(count, settings["train_size"], replace=False))
+            sample = vectors[rows]
+        index.train(np.ascontiguousarray(sample, dtype=np.float32))
+    if labels is not None:
+        if not is_ivf(index):
+            index = faiss.IndexIDMap2(index)
+        index.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32), np.asarray(labels, dtype=np.int64))
+    else:
+        index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+    configure_search(index, settings)
+    return index
+
+
+def is_ivf(index):
+    return isinstance(faiss.downcast_index(index), faiss.IndexIVF)
+
+
+def configure_search(index, settings):
+    """Apply the query-time parameters (nprobe, efSearch) that the index supports."""
+    parameters = faiss.ParameterSpace()
+    inner = faiss.downcast_index(index)
+    if isinstance(inner, faiss.IndexIDMap):
+        inner = faiss.downcast_index(inner.index)
+    if hasattr(inner, "nprobe"):
+        parameters.set_index_parameter(index, "nprobe", settings["nprobe"])
+    if hasattr(inner, "hnsw"):
+        parameters.set_index_parameter(index, "efSearch", settings["ef_search"])
+    return index
+
+MMAP_FLAGS = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+
+
+class LabelMap:
+    """Read-only label -> chunk id lookup over sorted, memory-mapped arrays."""
+
+    def __init__(self, labels, ids):
+        self.labels = labels
+        self.ids = ids
+
+    def get(self, label):
+        position = int(np.searchsorted(self.labels, label))
+        if position < len(self.labels) and self.labels[position] == label:
+            return str(self.ids[position])
+        return None
+
+    def __len__(self):
+        return len(self.labels)
+
 
 class VectorStore:
-    def __init__(self, config):
+    """FAISS index over chunk embeddings, published as immutable versions.
+
+    Every version lives in `output_dir/versions/<version>/` with `index.faiss`, `ids.json`,
+    which maps each chunk id to its int64 label in the index and its content hash, the same
+    mapping as sorted `labels.npy`/`label_ids.npy` arrays, and the BM25 arrays (`bm25_*.npy`,
+    `bm25.json`) for the lexical index over the same chunks, updated together with it. The
+    `CURRENT` file names the published version and is swapped with an atomic rename, so a
+    running server notices a new version on its next search (at most every
+    `reload_interval` seconds) and swaps to it without restarting.
+
+    A `read_only` store, as used by serving workers, memory-maps the version instead of
+    reading it into the heap: FAISS is opened with IO_FLAG_MMAP and the label and BM25
+    arrays with numpy mmap. Workers serving the same version then share those pages
+    through the page cache, so memory grows far slower than the number of workers.
+    Read-only stores cannot be updated, and fail to load rather than build when nothing is
+    published yet; `vector_store.mmap: false` turns the memory-mapping off.
+    """
+
+    INDEX_FILE = "index.faiss"
+    IDS_FILE = "ids.json"
+    LABELS_FILE = "labels.npy"
+    LABEL_IDS_FILE = "label_ids.npy"
+
+    def __init__(self, config, read_only=False):
         self.embedding_dir = config["embeddings"]["output_dir"]
         self.output_dir = config["vector_store"]["output_dir"]
-        self.index_path = config["vector_store"]["index_path"]
-        os.makedirs(self.output_dir, exist_ok=True)
+        self.versions_dir = os.path.join(self.output_dir, "versions")
+        self.current_path = os.path.join(self.output_dir, "CURRENT")
+        self.keep_versions = config["vector_store"].get("keep_versions", 2)
+        self.reload_interval = config["vector_store"].get("reload_interval", 5)
+        self.index_settings = index_settings(config)
+        self.read_only = read_only
+        self.mmap = read_only and config["vector_store"].get("mmap", True)
+        self.config = config
+        self.chunk_store = DocumentStore.chunks_from_config(config)
+        os.makedirs(self.versions_dir, exist_ok=True)
+        self.lock = threading.Lock()
         self.index = None
-        self.doc_ids = []
+        self.bm25 = None
+        self.version = None
+        self.doc_ids = {}   # label -> chunk id
+        self.labels = {}    # chunk id -> [label, content hash]
+        self.next_label = 0
+        self.last_reload_check = 0.0
 
     def build(self):
+        """Index all current embeddings from scratch and publish them; returns the new version."""
         try:
-            embeddings = np.load(os.path.join(self.embedding_dir, "embeddings.npy"), allow_pickle=True)
-            dimension = embeddings[0]["embedding"].shape[0]
-            self.index = faiss.IndexFlatL2(dimension)
-            vectors = np.array([item["embedding"] for item in embeddings], dtype=np.float32)
-            self.doc_ids = [item["id"] for item in embeddings]
-            self.index.add(vectors)
+            ids, vectors = load_embeddings(self.embedding_dir)
+            hashes = load_hashes(self.embedding_dir)
+            labels = np.arange(len(ids), dtype=np.int64)
+            index = create_index(self.index_settings, vectors, labels)
+            mapping = {str(doc_id): [int(label), str(content_hash)] for doc_id, label, content_hash in zip(ids, labels, hashes)}
+            bm25 = BM25Index.from_config(self.config)
+            for chunk in self.chunk_store.load():
+                if chunk["id"] in mapping:
+                    bm25.add(chunk["id"], chunk["content"])
+            self._set_state(index, mapping, len(ids), None, bm25)
             try:
-                faiss.write_index(self.index, self.index_path)
-                print(f"Vector store built and saved to {self.index_path}")
+                self.publish()
+                logger.info("Vector store (%s) built and published as version %s", self.index_settings["type"], self.version)
+                return self.version
             except Exception as e:
-                print(f"Error writing index to {self.index_path}: {e}")
-                print("Please check file permissions, ensure the file is not locked, or run the script as Administrator.")
+                logger.error("Error writing index to %s: %s. Please check file permissions, ensure the file is not "
+                             "locked, or run the script as Administrator.", self.versions_dir, e)
                 raise
         except FileNotFoundError:
-            print(f"Error: embeddings.npy not found in {self.embedding_dir}. Run embedding_generator.py first.")
+            logger.error("embeddings.npy not found in %s. Run embedding_generator.py first.", self.embedding_dir)
             raise
         except Exception as e:
-            print(f"Error building vector store: {e}")
+            logger.error("Error building vector store: %s", e)
             raise
 
+    def _set_state(self, index, mapping, next_label, version, bm25):
+        doc_ids = {label: doc_id for doc_id, (label, _) in mapping.items()}
+        with self.lock:
+            self.index = index
+            self.bm25 = bm25
+            self.labels = mapping
+            self.doc_ids = doc_ids
+            self.next_label = next_label
+            self.version = version
+
+    def current_version(self):
+        try:
+            with open(self.current_path, "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
     def load(self):
-        if os.path.exists(self.index_path):
-            self.index = faiss.read_index(self.index_path)
-            embeddings = np.load(os.path.join(self.embedding_dir, "embeddings.npy"), allow_pickle=True)
-            self.doc_ids = [item["id"] for item in embeddings]
-        else:
-            print(f"Index file {self.index_path} not found. Building new index...")
+        version = self.current_version()
+        if version is None:
+            if self.read_only:
+                # Serving workers never build: each would embed the corpus and publish its own copy
+                raise FileNotFoundError(f"No published index in {self.output_dir}; "
+                                        "build one with python modules/vector_store.py")
+            logger.warning("No published index in %s. Building new index...", self.output_dir)
             self.build()
+            return
+        self._load_version(version)
 
-    def search(self, query_embedding, k):
+    def _load_version(self, version):
+        version_dir = os.path.join(self.versions_dir, version)
+        if self.read_only:
+            self._load_read_only(version, version_dir)
+            return
+        index = configure_search(faiss.read_index(os.path.join(version_dir, self.INDEX_FILE)), self.index_settings)
+        with open(os.path.join(version_dir, self.IDS_FILE), "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        bm25 = BM25Index.load(version_dir)
+        self._set_state(index, saved["ids"], saved["next_label"], version, bm25)
+
+    def _read_index_mmap(self, path):
+        try:
+            return faiss.read_index(path, MMAP_FLAGS)
+        except RuntimeError:
+            # IVF inverted lists cannot be mapped in place (IO_FLAG_MMAP_IFC); plain
+            # IO_FLAG_MMAP maps them through OnDiskInvertedLists instead
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+
+    def _load_read_only(self, version, version_dir):
+        mmap_mode = "r" if self.mmap else None
+        path = os.path.join(version_dir, self.INDEX_FILE)
+        index = configure_search(self._read_index_mmap(path) if self.mmap else faiss.read_index(path), self.index_settings)
+        doc_ids = LabelMap(np.load(os.path.join(version_dir, self.LABELS_FILE), mmap_mode=mmap_mode),
+                           np.load(os.path.join(version_dir, self.LABEL_IDS_FILE), mmap_mode=mmap_mode))
+        bm25 = FrozenBM25Index.load(version_dir, mmap=self.mmap)
+        with self.lock:
+            self.index = index
+            self.bm25 = bm25
+            self.doc_ids = doc_ids
+            self.labels = None
+            self.version = version
+
+    def maybe_reload(self):
+        """Swap to a newly published version; returns True if one was loaded."""
+        now = time.monotonic()
+        if now - self.last_reload_check < self.reload_interval:
+            return False
+        self.last_reload_check = now
+        version = self.current_version()
+        if version is None or version == self.version:
+            return False
+        try:
+            self._load_version(version)
+        except (FileNotFoundError, RuntimeError) as e:
+            # Pruned or replaced while loading; the next check picks up the newer version
+            logger.warning("Could not load vector store version %s: %s", version, e)
+            return False
+        logger.info("Vector store reloaded version %s", version)
+        return True
+
+    def publish(self):
+        """Write the in-memory index as a new version and atomically make it current."""
+        version = time.strftime("%Y%m%d-%H%M%S") + f"-{time.time_ns() % 10 ** 9:09d}"
+        version_dir = os.path.join(self.versions_dir, version)
+        os.makedirs(version_dir)
+        with self.lock:
+            faiss.write_index(self.index, os.path.join(version_dir, self.INDEX_FILE))
+            self.bm25.save(version_dir)
+            saved = {"next_label": self.next_label, "ids": self.labels}
+        order = sorted(self.labels.items(), key=lambda item: item[1][0])
+        np.save(os.path.join(version_dir, self.LABELS_FILE), np.array([label for _, (label, _) in order], dtype=np.int64))
+        np.save(os.path.join(version_dir, self.LABEL_IDS_FILE), np.array([doc_id for doc_id, _ in order], dtype=str))
+        with open(os.path.join(version_dir, self.IDS_FILE), "w", encoding="utf-8") as f:
+            json.dump(saved, f)
+        tmp_path = self.current_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_path, self.current_path)
+        self.version = version
+        self._prune_versions()
+        return version
+
+    def _prune_versions(self):
+        versions = sorted(os.listdir(self.versions_dir))
+        for version in versions[:-self.keep_versions]:
+            if version != self.version:
+                shutil.rmtree(os.path.join(self.versions_dir, version), ignore_errors=True)
+
+    def add(self, doc_ids, vectors, hashes=None):
+        """Add vectors for new chunk ids; existing ids are replaced."""
+        self._check_writable()
+        self.delete([doc_id for doc_id in doc_ids if doc_id in self.labels])
+        labels = np.arange(self.next_label, self.next_label + len(doc_ids), dtype=np.int64)
+        hashes = hashes if hashes is not None else [None] * len(doc_ids)
+        with self.lock:
+            self.index.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32), labels)
+            for doc_id, label, content_hash in zip(doc_ids, labels.tolist(), hashes):
+                self.labels[doc_id] = [label, content_hash]
+                self.doc_ids[label] = doc_id
+            self.next_label += len(doc_ids)
+
+    def update(self, doc_ids, vectors, hashes=None):
+        self.add(doc_ids, vectors, hashes)
+
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError("Read-only vector stores cannot be updated; use VectorStore(config)")
+
+    def delete(self, doc_ids):
+        self._check_writable()
+        labels = [self.labels[doc_id][0] for doc_id in doc_ids if doc_id in self.labels]
+        if not labels:
+            return 0
+        with self.lock:
+            # Raises for index types without removal support (HNSW); apply_delta then rebuilds
+            removed = self.index.remove_ids(np.asarray(labels, dtype=np.int64))
+            for doc_id in doc_ids:
+                entry = self.labels.pop(doc_id, None)
+                if entry is not None:
+                    self.doc_ids.pop(entry[0], None)
+        return removed
+
+    def apply_delta(self):
+        """Bring the published index in line with the current embeddings and publish it.
+
+        Chunks are compared by content hash, so only new, changed and removed chunks touch
+        the index. Falls back to a full build when nothing is published yet or the index type
+        cannot remove vectors. Returns the published version.
+        """
+        self._check_writable()
+        if self.index is None:
+            if self.current_version() is None:
+                return self.build()
+            self.load()
+        if isinstance(self.index, faiss.IndexIDMap) and is_ivf(self.index.index):
+            # Published before IVF indexes kept their own ids; removing from it would shift them
+            logger.warning("Version %s wraps its IVF index in an id map; rebuilding", self.version)
+            return self.build()
+        started = time.perf_counter()
+        ids, vectors = load_embeddings(self.embedding_dir)
+        hashes = load_hashes(self.embedding_dir)
+        changed_rows = []
+        present = set()
+        for row, (doc_id, content_hash) in enumerate(zip(ids.tolist(), hashes.tolist())):
+            present.add(doc_id)
+            entry = self.labels.get(doc_id)
+            if entry is None or entry[1] != content_hash:
+                changed_rows.append(row)
+        removed = [doc_id for doc_id in self.labels if doc_id not in present]
+        try:
+            self.delete(removed)
+            if changed_rows:
+                self.add([ids[row] for row in changed_rows], vectors[changed_rows], [hashes[row] for row in changed_rows])
+        except RuntimeError as e:
+            logger.warning("Index type %s does not support incremental updates (%s); rebuilding", self.index_settings["type"], e)
+            return self.build()
+        changed_ids = [str(ids[row]) for row in changed_rows]
+        self.bm25.remove_many(removed + changed_ids)
+        chunks = self.chunk_store.load()
+        for doc_id in changed_ids:
+            self.bm25.add(doc_id, chunks.get(doc_id)["content"])
+        if not changed_rows and not removed:
+            logger.info("Vector store is up to date")
+            return self.version
+        version = self.publish()
+        logger.info("Vector store updated in %.2fs: %d added/updated, %d removed, published version %s",
+                    time.perf_counter() - started, len(changed_rows), len(removed), version)
+        return version
+
+    def ensure_loaded(self):
+        """Load the published version on first use, then pick up newer ones."""
         if self.index is None:
             self.load()
-        distances, indices = self.index.search(query_embedding, k)
-        results = []
-        for idx, distance in zip(indices[0], distances[0]):
-            if idx != -1 and idx < len(self.doc_ids):
-                results.append((self.doc_ids[idx], distance))
-        return results
+        else:
+            self.maybe_reload()
+
+    def search_lexical(self, query, k):
+        """BM25 search over the chunks of the loaded version: [(chunk id, score)], best first."""
+        self.ensure_loaded()
+        with self.lock:
+            bm25 = self.bm25
+        return bm25.search(query, k)
+
+    def search(self, query_embedding, k):
+        return self.search_batch(query_embedding, k)[0]
+
+    def search_batch(self, query_embeddings, k):
+        """One FAISS search for a (n, dimension) matrix of queries: a result list per row."""
+        self.ensure_loaded()
+        with self.lock:
+            index, doc_ids = self.index, self.doc_ids
+        distances, indices = index.search(np.ascontiguousarray(query_embeddings, dtype=np.float32), k)
+        batch = []
+        for row_indices, row_distances in zip(indices, distances):
+            results = []
+            for idx, distance in zip(row_indices, row_distances):
+                doc_id = doc_ids.get(int(idx)) if idx != -1 else None
+                if doc_id is not None:
+                    results.append((doc_id, distance))
+            batch.append(results)
+        return batch
 
 if __name__ == "__main__":
     config = load_config()
+    configure_logging(config)
     vector_store = VectorStore(config)
-    vector_store.build()
\ No newline at end of file
+    # --update applies only the changes since the published version instead of a full build
+    if "--update" in sys.argv[1:]:
+        vector_store.apply_delta()
+    else:
+        vector_store.build()
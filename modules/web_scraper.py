@@ -1,11 +1,44 @@
+import logging
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
 from tqdm import tqdm
 from modules.config_loader import load_config
-import xml.etree.ElementTree as ET
-from urllib.parse import urljoin
+from modules.crawl_manifest import CrawlManifest
+from modules.metrics import configure_logging
+from modules.html_extractor import extract_text
+from modules.near_duplicates import NearDuplicateIndex
+from modules.sitemap_reader import SitemapReader
+from urllib.parse import urljoin, urlparse
 import hashlib
+import json
+
+logger = logging.getLogger(__name__)
+
+class HostRateLimiter:
+    """Spaces out requests to the same host so that at most `rate` requests/sec are sent."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
 
 class WebScraper:
     def __init__(self, config):
@@ -15,152 +48,308 @@ class WebScraper:
         self.articles_config = config["scraper"]["articles"]
         self.output_dir = config["scraper"]["output_dir"]
         os.makedirs(self.output_dir, exist_ok=True)
-        self.content_hashes = set()
+        self.manifest = CrawlManifest(config["scraper"].get("manifest_path", "data/crawl_manifest.json"))
+        self.delta_path = config["scraper"].get("delta_path", "data/crawl_delta.json")
+        # Content hash -> the saved file holding that content, and back. Seeded with the files
+        # the previous crawl saved, so pages duplicating an unchanged page are still skipped;
+        # a hash is released when the file owning it changes or is removed.
+        self.content_owners = {}
+        self.saved_hashes = {}
+        for entry in self.manifest.entries.values():
+            if entry.get("content_hash") and self._is_saved(entry):
+                self._claim_hash(entry["filename"], entry["content_hash"])
+        self.near_duplicates = NearDuplicateIndex.from_config(config)
+        if self.near_duplicates is not None:
+            for entry in self.manifest.entries.values():
+                if entry.get("simhash") is not None and self._is_saved(entry):
+                    self.near_duplicates.add(entry["filename"], entry["simhash"])
+
+        concurrency = config["scraper"].get("concurrency", {})
+        self.workers = max(1, concurrency.get("workers", 8))
+        self.timeout = concurrency.get("timeout", 10)
+        # Parse in separate processes so HTML parsing does not hold the GIL of the fetch threads
+        self.parse_workers = concurrency.get("parse_workers", 0)
+        self.parse_pool = None
+        self.rate_limiter = HostRateLimiter(concurrency.get("rate_limit_per_host", 0))
+        # One pooled session shared by all workers so connections are kept alive between pages
+        pool_size = concurrency.get("pool_size", self.workers)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.sitemap_reader = SitemapReader(self.fetch_stream, workers=concurrency.get("sitemap_workers", 4))
+
+    def fetch(self, url, headers=None):
+        self.rate_limiter.wait(url)
+        response = self.session.get(url, timeout=self.timeout, headers=headers)
+        response.raise_for_status()
+        return response
+
+    def fetch_stream(self, url):
+        self.rate_limiter.wait(url)
+        response = self.session.get(url, timeout=self.timeout, stream=True)
+        response.raise_for_status()
+        return response
 
     def scrape_page(self, url):
         try:
-            print(f"Started scraping {url}:")
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            # Remove headers, footers, nav, buttons, forms
-            for element in soup.find_all(['header', 'footer', 'nav', 'button', 'a', 'form']):
-                element.decompose()
-
-            # Exclude specific classes/IDs
-            for element in soup.find_all(class_=['navbar', 'footer', 'menu', 'header', 'skip-to-content', 'profile-icon', 'consent', 'disclaimer']):
-                element.decompose()
-            for element in soup.find_all(id=['navbar', 'footer', 'menu', 'header']):
-                element.decompose()
-
-            # Extract content from main/article or specific elements
-            content = []
-            main_content = soup.find(['main', 'article'])
-            if main_content:
-                for element in main_content.find_all(['p', 'h1', 'h2', 'h3', 'td', 'th']):
-                    text = element.get_text(separator=" ", strip=True)
-                    if text:
-                        content.append(text)
-            else:
-                for element in soup.find_all(['p', 'h1', 'h2', 'h3', 'td', 'th']):
-                    text = element.get_text(separator=" ", strip=True)
-                    if text:
-                        content.append(text)
-
-            # Remove noisy phrases
-            noisy_phrases = [
-                "by continuing, you agree to",
-                "authorize our representatives",
-                "call/email/sms/whatsapp",
-                "apply online",
-                "digital fixed deposit booking",
-                "open fixed investment plan online",
-                "please enter the monthly installment amount",
-                "popular faqs",
-                "recent faqs",
-                "most viewed faqs",
-                "the common man's partner in prosperity",
-                "features & benefits",
-                "faqs",
-                "step 01", "step 02", "step 03", "step 04",
-                "our interest rates starts from",
-                "we’re here for you",
-                "check out the latest"
-            ]
-            cleaned_content = " ".join(content)
-            for phrase in noisy_phrases:
-                cleaned_content = cleaned_content.lower().replace(phrase.lower(), "").strip()
-            # Normalize spaces
-            cleaned_content = re.sub(r'\s+', ' ', cleaned_content).strip()
-
-            return cleaned_content if cleaned_content else None
+            response = self.fetch(url)
+            return self.parse_html(response.text)
         except Exception as e:
             print(f"Error scraping {url}: {e}")
             return None
 
-    def save_content(self, content, filename):
+    def crawl_page(self, url):
+        """Fetch `url` with conditional headers and parse it only if it changed.
+
+        Returns a (status, result) pair; status is "fetched" (result holds the content and
+        validators), "unchanged", "gone" (404/410) or "error".
+        """
+        status, result = self.fetch_page(url)
+        if status != "fetched":
+            return status, result
+        try:
+            result["content"] = self.parse_html(result.pop("html"))
+        except Exception as e:
+            print(f"Error parsing {url}: {e}")
+            return "error", None
+        return status, result
+
+    def fetch_page(self, url):
+        """Like crawl_page without the parsing: a "fetched" result holds the raw "html"."""
+        entry = self.manifest.get(url)
+        saved = entry is not None and self._is_saved(entry)
+        headers = self.manifest.conditional_headers(url) if saved else {}
+        try:
+            response = self.fetch(url, headers=headers)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code in (404, 410):
+                return "gone", None
+            print(f"Error scraping {url}: {e}")
+            return "error", None
+        except Exception as e:
+            print(f"Error scraping {url}: {e}")
+            return "error", None
+
+        if response.status_code == 304:
+            return "unchanged", None
+        raw_hash = hashlib.md5(response.content).hexdigest()
+        if saved and entry.get("raw_hash") == raw_hash:
+            return "unchanged", None
+        return "fetched", {
+            "html": response.text,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "raw_hash": raw_hash,
+        }
+
+    def parse_html(self, html):
+        if self.parse_pool is not None:
+            return self.parse_pool.submit(extract_text, html).result()
+        return extract_text(html)
+
+    def save_content(self, content, filename, fingerprint=None):
+        """Write `content` unless it duplicates a page already seen; returns True if written.
+
+        With near-duplicate detection enabled, pages whose SimHash `fingerprint` is within the
+        configured threshold of an already saved page are skipped as well.
+        """
         if content:
             content_hash = hashlib.md5(content.encode('utf-8')).hexdigest()
-            if content_hash in self.content_hashes:
+            safe_filename = self.safe_filename(filename)
+            owner = self.content_owners.get(content_hash)
+            if owner is not None and owner != safe_filename:
                 print(f"Skipping duplicate content for {filename}")
-                return
-            self.content_hashes.add(content_hash)
-            safe_filename = filename.replace("/", "_").replace(":", "_")
+                return False
+            if self.near_duplicates is not None:
+                if fingerprint is None:
+                    fingerprint = self.near_duplicates.fingerprint(content)
+                match = self.near_duplicates.find(fingerprint, exclude=safe_filename)
+                if match is not None:
+                    self.near_duplicates.collapsed += 1
+                    print(f"Skipping near-duplicate content for {filename} (similar to {match})")
+                    return False
+                self.near_duplicates.add(safe_filename, fingerprint)
+            self._claim_hash(safe_filename, content_hash)
             with open(os.path.join(self.output_dir, safe_filename), "w", encoding="utf-8") as f:
                 f.write(content)
+            return True
+        return False
+
+    @staticmethod
+    def safe_filename(filename):
+        return filename.replace("/", "_").replace(":", "_")
+
+    def _is_saved(self, entry):
+        return bool(entry.get("filename")) and os.path.exists(os.path.join(self.output_dir, entry["filename"]))
+
+    def _claim_hash(self, filename, content_hash):
+        self._release_hash(filename)
+        self.content_owners[content_hash] = filename
+        self.saved_hashes[filename] = content_hash
+
+    def _release_hash(self, filename):
+        content_hash = self.saved_hashes.pop(filename, None)
+        if content_hash is not None and self.content_owners.get(content_hash) == filename:
+            del self.content_owners[content_hash]
+
+    def _delete_file(self, filename):
+        """Delete a saved file and forget its content, so other pages may claim it."""
+        self._release_hash(filename)
+        if self.near_duplicates is not None:
+            self.near_duplicates.remove(filename)
+        if os.path.exists(os.path.join(self.output_dir, filename)):
+            os.remove(os.path.join(self.output_dir, filename))
+
+    def _remove_url(self, url):
+        filename = self.manifest.remove(url)
+        if filename:
+            self._delete_file(filename)
 
     def get_urls_from_sitemap(self, sitemap_url):
-        try:
-            response = requests.get(sitemap_url, timeout=10)
-            response.raise_for_status()
-            root = ET.fromstring(response.content)
-            namespace = {"sitemap": "http://www.sitemaps.org/schemas/sitemap/0.9"}
-            urls = [elem.text for elem in root.findall(".//sitemap:loc", namespace)]
-            return urls
-        except Exception as e:
-            print(f"Error parsing sitemap {sitemap_url}: {e}")
-            return []
+        return list(self.sitemap_reader.iter_urls([sitemap_url]))
 
     def get_urls_from_sitemaps(self, sitemap_urls):
-        all_urls = []
-        for sitemap_url in sitemap_urls:
-            response = requests.get(sitemap_url, timeout=10)
-            response.raise_for_status()
-            root = ET.fromstring(response.content)
-            namespace = {"sitemap": "http://www.sitemaps.org/schemas/sitemap/0.9"}
-            if root.tag.endswith("sitemapindex"):
-                sitemap_urls_inner = [elem.text for elem in root.findall(".//sitemap:loc", namespace)]
-                for inner_sitemap_url in sitemap_urls_inner:
-                    all_urls.extend(self.get_urls_from_sitemap(inner_sitemap_url))
-            else:
-                all_urls.extend(self.get_urls_from_sitemap(sitemap_url))
-        return all_urls
+        """Yield page urls from `sitemap_urls`, following nested sitemap indexes, as they are parsed."""
+        return self.sitemap_reader.iter_urls(sitemap_urls)
 
     def scrape_urls(self, urls, prefix, max_items, desc):
-        for i, url in enumerate(tqdm(urls[:max_items], desc=desc)):
-            if prefix == "article" and "articles" in self.articles_config.get("url_pattern", "") and "articles" not in url:
-                print(f"Skipping {url}: Does not match expected article pattern.")
-                continue
-            content = self.scrape_page(url)
-            if content:
-                filename = f"{prefix}_{url.replace(self.base_domain, '').replace('/', '_')}.txt"
-                self.save_content(content, filename)
+        """Scrape up to `max_items` urls concurrently and save their content.
 
-    def scrape(self):
-        page_urls = []
-        if self.pages_config.get("sitemaps"):
-            page_urls = self.get_urls_from_sitemaps(self.pages_config["sitemaps"])
-        elif self.pages_config.get("urls"):
-            page_urls = self.pages_config["urls"]
-        elif self.pages_config.get("url_pattern"):
-            page_urls = [
-                self.pages_config["url_pattern"].format(i)
-                for i in range(1, self.pages_config["max_pages"] + 1)
-            ]
+        Pages are fetched by a pool of `self.workers` threads (and parsed in a pool of
+        `self.parse_workers` processes when set), but results are saved in input order so
+        duplicate detection keeps the first url exactly like a serial crawl.
+        Returns the number of pages fetched.
+        """
+        started = time.perf_counter()
+        if self.parse_workers:
+            self.parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+        try:
+            scraped = self._scrape_ordered(urls, prefix, max_items, desc)
+        finally:
+            if self.parse_pool is not None:
+                self.parse_pool.shutdown()
+                self.parse_pool = None
+
+        elapsed = time.perf_counter() - started
+        rate = scraped / elapsed if elapsed > 0 else 0.0
+        print(f"{desc}: {scraped} pages in {elapsed:.1f}s ({rate:.1f} pages/sec)")
+        return scraped
+
+    def skip_url(self, url, prefix):
+        if prefix == "article" and "articles" in self.articles_config.get("url_pattern", "") and "articles" not in url:
+            print(f"Skipping {url}: Does not match expected article pattern.")
+            return True
+        return False
+
+    def _scrape_ordered(self, urls, prefix, max_items, desc):
+        scraped = 0
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor, tqdm(desc=desc) as progress:
+            for url in islice(urls, max_items):
+                if self.skip_url(url, prefix):
+                    continue
+                pending.append((url, executor.submit(self.crawl_page, url)))
+                # Bound the number of in-flight pages so large url lists are not all queued at once
+                if len(pending) >= self.workers * 2:
+                    self._save_result(*pending.popleft(), prefix)
+                    scraped += 1
+                    progress.update(1)
+            while pending:
+                self._save_result(*pending.popleft(), prefix)
+                scraped += 1
+                progress.update(1)
+        return scraped
+
+    def _save_result(self, url, future, prefix):
+        self.record_result(url, *future.result(), prefix)
+
+    def record_result(self, url, status, result, prefix):
+        """Save a crawl_page result and update the manifest.
+
+        Returns the filename the url's content is saved under after this crawl, or None if
+        it has none (gone, a duplicate, or never fetched successfully).
+        """
+        if status == "gone":
+            self._remove_url(url)
+            return None
+        if status != "fetched" or not result["content"]:
+            self.manifest.mark_seen(url)
+            entry = self.manifest.get(url)
+            return entry["filename"] if entry is not None and self._is_saved(entry) else None
+        content = result["content"]
+        filename = self.safe_filename(f"{prefix}_{url.replace(self.base_domain, '').replace('/', '_')}.txt")
+        content_hash = hashlib.md5(content.encode('utf-8')).hexdigest()
+        fingerprint = self.near_duplicates.fingerprint(content) if self.near_duplicates is not None else None
+        entry = self.manifest.get(url)
+        if entry and entry.get("content_hash") == content_hash and self._is_saved(entry):
+            # The page was re-sent but its cleaned text is the same as last time
+            written = False
+            saved = entry["filename"]
         else:
+            written = self.save_content(content, filename, fingerprint)
+            if not written and entry and self._is_saved(entry):
+                # The page now duplicates another one, so its previously saved version is stale
+                self._delete_file(entry["filename"])
+                self.manifest.mark_removed(entry["filename"])
+            saved = filename if written else None
+        self.manifest.record(url, filename, result["etag"], result["last_modified"], result["raw_hash"], content_hash, written, fingerprint)
+        return saved
+
+    def finish_crawl(self, detect_removed=True):
+        """Persist the manifest and write the list of changed and removed documents.
+
+        Urls from the previous crawl that were not visited this run are treated as removed
+        and their files deleted, unless `detect_removed` is False or a sitemap could not be
+        read, in which case the url list is incomplete and nothing is removed.
+        """
+        failures = self.sitemap_reader.failures
+        if detect_removed and failures:
+            logger.warning("Not removing unvisited pages: %d sitemap(s) could not be read (%s)",
+                           len(failures), ", ".join(url for url, _ in failures))
+            detect_removed = False
+        if detect_removed:
+            for url in self.manifest.unseen_urls():
+                self._remove_url(url)
+        self.manifest.save()
+        if self.near_duplicates is not None:
+            print(f"Collapsed {self.near_duplicates.collapsed} near-duplicate pages")
+        delta = {"changed": sorted(set(self.manifest.changed)), "removed": sorted(set(self.manifest.removed))}
+        os.makedirs(os.path.dirname(self.delta_path) or ".", exist_ok=True)
+        with open(self.delta_path, "w", encoding="utf-8") as f:
+            json.dump(delta, f)
+        print(f"Crawl delta: {len(delta['changed'])} changed, {len(delta['removed'])} removed (written to {self.delta_path})")
+        return delta
+
+    def section_urls(self, section, max_key):
+        """Urls of a `pages`/`articles` config section, or None if it defines none."""
+        if section.get("sitemaps"):
+            return self.get_urls_from_sitemaps(section["sitemaps"])
+        if section.get("urls"):
+            return section["urls"]
+        if section.get("url_pattern"):
+            return [section["url_pattern"].format(i) for i in range(1, section[max_key] + 1)]
+        return None
+
+    def scrape(self):
+        page_urls = self.section_urls(self.pages_config, "max_pages")
+        if page_urls is None:
             print("Error: No sitemaps, urls, or url_pattern defined for pages.")
             return
 
         self.scrape_urls(page_urls, "page", self.pages_config["max_pages"], "Scraping pages")
 
-        article_urls = []
-        if self.articles_config.get("sitemaps"):
-            article_urls = self.get_urls_from_sitemaps(self.articles_config["sitemaps"])
-        elif self.articles_config.get("urls"):
-            article_urls = self.articles_config["urls"]
-        elif self.articles_config.get("url_pattern"):
-            article_urls = [
-                self.articles_config["url_pattern"].format(i)
-                for i in range(1, self.articles_config["max_articles"] + 1)
-            ]
-        else:
+        article_urls = self.section_urls(self.articles_config, "max_articles")
+        if article_urls is None:
             print("Error: No sitemaps, urls, or url_pattern defined for articles.")
-            return
+            # Articles were not crawled, so their absence does not mean they were removed
+            return self.finish_crawl(detect_removed=False)
 
         self.scrape_urls(article_urls, "article", self.articles_config["max_articles"], "Scraping articles")
+        return self.finish_crawl()
 
 if __name__ == "__main__":
     config = load_config()
+    configure_logging(config)
     scraper = WebScraper(config)
     scraper.scrape()
\ No newline at end of file
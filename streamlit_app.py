@@ -5,9 +5,12 @@ from modules.config_loader import load_config
 st.title("Shriram Finance Chatbot")
 st.write("Ask about Shriram Finance products and services")
 
-# Load configuration and initialize RAG model
-config = load_config()
-rag = RAGModel(config)
+# Load configuration and initialize RAG model once per server process, not on every rerun
+@st.cache_resource
+def load_rag():
+    return RAGModel(load_config())
+
+rag = load_rag()
 
 # Initialize session state for query history
 if "query_history" not in st.session_state:
@@ -29,4 +32,4 @@ if query:
 # Display query history
 st.subheader("Recent Queries")
 for q in st.session_state.query_history[-5:]:
-    st.write(f"- {q}")
\ No newline at end of file
+    st.write(f"- {q}")
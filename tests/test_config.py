@@ -0,0 +1,31 @@
+import os
+
+from modules.config_loader import load_config
+from modules.query_cache import QueryCache
+from modules.vector_store import INDEX_DEFAULTS
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.yml")
+
+SECTIONS = {"scraper", "dedup", "pipeline", "embeddings", "rag", "chatbot", "knowledgebase", "vector_store", "cache",
+            "serving", "logging", "metrics", "intents", "generator"}
+
+
+def test_top_level_sections():
+    config = load_config(CONFIG_PATH)
+    assert SECTIONS <= set(config)
+
+
+def test_vector_store_index_keys():
+    index = load_config(CONFIG_PATH)["vector_store"]["index"]
+    assert set(index) == set(INDEX_DEFAULTS)
+
+
+def test_cache_settings_reach_query_cache():
+    config = load_config(CONFIG_PATH)
+    settings = config["cache"]
+    assert set(settings) == {"embedding_size", "retrieval_size", "answer_size", "answer_similarity"}
+    cache = QueryCache(config)
+    assert cache.embeddings.max_size == settings["embedding_size"]
+    assert cache.retrievals.max_size == settings["retrieval_size"]
+    assert cache.answers.max_size == settings["answer_size"]
+    assert cache.answers.threshold == settings["answer_similarity"]
@@ -0,0 +1,55 @@
+import json
+import sqlite3
+
+import numpy as np
+import pytest
+
+from modules.context_builder import ContextBuilder
+from modules.session_store import MemorySessionStore, SQLiteSessionStore
+
+CONFIG = {"chatbot": {"context_window": 5, "query_token_budget": 48, "history_token_budget": 256,
+                      "history_weight": 0.5}}
+
+
+def make_store(backend, tmp_path):
+    if backend == "memory":
+        return MemorySessionStore(max_turns=5)
+    return SQLiteSessionStore(str(tmp_path / "sessions.db"), max_turns=5)
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_embeddings_are_stored_as_float32(backend, tmp_path):
+    builder = ContextBuilder(CONFIG, make_store(backend, tmp_path))
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((3, 384)).astype(np.float32)
+    for i, embedding in enumerate(embeddings):
+        builder.add_interaction(f"question {i}", f"answer {i}", "s", embedding.tolist())
+
+    history = builder.sessions.get("s")
+    for interaction, embedding in zip(history, embeddings):
+        assert isinstance(interaction["embedding"], np.ndarray)
+        assert interaction["embedding"].dtype == np.float32
+        np.testing.assert_array_equal(interaction["embedding"], embedding)
+
+    context = builder.build_context("question 3", "s", embeddings[0])
+    assert context["query"] == "question 3 question 2 question 1 question 0"
+    assert context["embedding"].shape == (1, 384)
+    assert builder.transcript("question 3", "s").endswith("User: question 2\nBot: answer 2\nUser: question 3\n")
+
+
+def test_sqlite_stores_embeddings_as_bytes(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), max_turns=5)
+    ContextBuilder(CONFIG, store).add_interaction("question", "answer", "s", np.ones(384, dtype=np.float32))
+    with sqlite3.connect(store.path) as connection:
+        (history,) = connection.execute("SELECT history FROM sessions").fetchone()
+    assert isinstance(json.loads(history)[0]["embedding"], str)
+    assert len(history) < 384 * 4 * 2
+
+
+def test_sqlite_reads_embeddings_stored_as_lists(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), max_turns=5)
+    store.append("s", {"query": "question", "response": "answer", "query_tokens": 1})
+    with sqlite3.connect(store.path) as connection:
+        connection.execute("UPDATE sessions SET history = ?",
+                           (json.dumps([{"query": "question", "response": "answer", "embedding": [0.5, 1.5]}]),))
+    np.testing.assert_array_equal(store.get("s")[0]["embedding"], np.array([0.5, 1.5], dtype=np.float32))
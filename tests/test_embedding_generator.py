@@ -0,0 +1,47 @@
+import numpy as np
+
+from benchmarks.stub_encoder import HashingEncoder
+from modules.document_store import DocumentStore
+from modules.embedding_generator import EmbeddingGenerator
+
+
+class CountingEncoder(HashingEncoder):
+    def __init__(self):
+        super().__init__(dimension=16)
+        self.encoded = 0
+
+    def encode(self, texts, batch_size=None, show_progress_bar=False):
+        self.encoded += len(texts)
+        return super().encode(texts, batch_size, show_progress_bar)
+
+
+def make_config(root):
+    return {
+        "knowledgebase": {"output_dir": str(root / "knowledgebase"), "chunks_dir": str(root / "chunks")},
+        "embeddings": {"model": "hashing", "output_dir": str(root / "embeddings"), "batch_size": 4},
+    }
+
+
+def write_chunks(config, texts):
+    with DocumentStore.chunks_from_config(config).writer() as writer:
+        for i, text in enumerate(texts):
+            writer.add({"id": f"chunk-{i}", "content": text})
+
+
+def test_generate_encodes_in_batches_and_reuses_cache(tmp_path):
+    config = make_config(tmp_path)
+    texts = [f"gold loan plan {i} with tenure {i % 3}" for i in range(10)]
+    write_chunks(config, texts)
+    encoder = CountingEncoder()
+    ids, embeddings = EmbeddingGenerator(config, encoder).generate()
+    assert ids.tolist() == [f"chunk-{i}" for i in range(10)]
+    np.testing.assert_allclose(embeddings, HashingEncoder(16).encode(texts), rtol=1e-6)
+    assert encoder.encoded == 10
+
+    # Only the changed chunk is encoded again
+    texts[3] = "fixed deposit rates"
+    write_chunks(config, texts)
+    encoder.encoded = 0
+    ids, embeddings = EmbeddingGenerator(config, encoder).generate()
+    assert encoder.encoded == 1
+    np.testing.assert_allclose(embeddings, HashingEncoder(16).encode(texts), rtol=1e-6)
@@ -0,0 +1,88 @@
+import json
+import threading
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from modules.generator import SummaryGenerator  # noqa: E402
+
+PROMPT = "Gold loans are available at every branch with a tenure of up to 12 months."
+
+
+def byte_characters():
+    """The printable characters byte-level BPE uses for the 256 byte values (as in GPT-2)."""
+    printable = set(range(ord("!"), ord("~") + 1)) | set(range(ord("¡"), ord("¬") + 1)) | set(range(ord("®"), ord("ÿ") + 1))
+    characters = sorted(printable)
+    characters += [256 + n for n in range(256 - len(printable))]
+    return [chr(c) for c in characters]
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    """A randomly initialised two-layer BART with a character-level tokenizer, saved locally."""
+    path = tmp_path_factory.mktemp("tiny-bart")
+    vocab = {token: i for i, token in enumerate(["<s>", "<pad>", "</s>", "<unk>"] + byte_characters() + ["<mask>"])}
+    with open(path / "vocab.json", "w", encoding="utf-8") as f:
+        json.dump(vocab, f)
+    with open(path / "merges.txt", "w", encoding="utf-8") as f:
+        f.write("#version: 0.2\n")
+    tokenizer = transformers.BartTokenizer(str(path / "vocab.json"), str(path / "merges.txt"))
+    tokenizer.save_pretrained(str(path))
+    torch.manual_seed(0)
+    model_config = transformers.BartConfig(
+        vocab_size=len(vocab), d_model=16, encoder_layers=1, decoder_layers=1, encoder_attention_heads=2,
+        decoder_attention_heads=2, encoder_ffn_dim=32, decoder_ffn_dim=32, max_position_embeddings=128,
+        bos_token_id=0, pad_token_id=1, eos_token_id=2, decoder_start_token_id=2, forced_bos_token_id=None,
+    )
+    transformers.BartForConditionalGeneration(model_config).save_pretrained(str(path))
+    return str(path)
+
+
+def make_config(model, **settings):
+    generator = {"model": model, "local_files_only": True, "max_input_tokens": 64, "max_length": 12,
+                 "min_length": 2, "num_beams": 1}
+    generator.update(settings)
+    return {"generator": generator}
+
+
+@pytest.mark.parametrize("backend", ["torch", "int8"])
+def test_backends_summarize(tiny_model, backend):
+    generator = SummaryGenerator(make_config(tiny_model, backend=backend))
+    summaries = generator.generate([PROMPT, "Fixed deposits pay interest monthly."])
+    assert len(summaries) == 2
+    assert all(isinstance(summary, str) for summary in summaries)
+    assert generator.summarize(PROMPT) == summaries[0]
+    assert generator.stats() == {"model": tiny_model, "backend": backend}
+
+
+def test_unknown_backend(tiny_model):
+    with pytest.raises(ValueError):
+        SummaryGenerator(make_config(tiny_model, backend="tensorrt"))
+
+
+def test_batching_groups_concurrent_requests(tiny_model):
+    generator = SummaryGenerator(make_config(tiny_model, batching={"enabled": True, "max_batch_size": 4,
+                                                                   "max_wait_ms": 200}))
+    results = [None] * 4
+    barrier = threading.Barrier(4)
+
+    def worker(i):
+        barrier.wait()
+        results[i] = generator.summarize(PROMPT)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(isinstance(result, str) for result in results)
+    batching = generator.stats()["batching"]
+    assert batching["items"] == 4
+    assert batching["batches"] < 4
+
+
+def test_stream_matches_greedy_summary(tiny_model):
+    generator = SummaryGenerator(make_config(tiny_model))
+    assert "".join(generator.stream(PROMPT)) == generator.summarize(PROMPT)
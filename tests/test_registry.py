@@ -0,0 +1,49 @@
+import threading
+
+from modules import registry
+from modules.registry import ModelRegistry
+
+
+def test_get_loads_once():
+    models = ModelRegistry()
+    calls = []
+    barrier = threading.Barrier(4)
+
+    def load():
+        calls.append(1)
+        return object()
+
+    def worker(results):
+        barrier.wait()
+        results.append(models.get("model", load))
+
+    results = []
+    threads = [threading.Thread(target=worker, args=(results,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert set(models.stats()) == {"model"}
+
+
+def test_peek_never_loads():
+    models = ModelRegistry()
+    assert models.peek("model") is None
+    assert models.stats() == {}
+    instance = models.get("model", object)
+    assert models.peek("model") is instance
+
+
+def test_loaded_summary_generator_does_not_load(monkeypatch):
+    models = ModelRegistry()
+    monkeypatch.setattr(registry, "default_registry", models)
+    config = {"generator": {"model": "tiny", "backend": "torch"}}
+    assert registry.loaded_summary_generator(config) is None
+    assert models.stats() == {}
+
+    generator = object()
+    models.get("generator:tiny:torch", lambda: generator)
+    assert registry.loaded_summary_generator(config) is generator
+    assert registry.loaded_summary_generator({"generator": {"model": "tiny", "backend": "int8"}}) is None
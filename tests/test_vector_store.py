@@ -0,0 +1,103 @@
+import copy
+import os
+
+import numpy as np
+import pytest
+
+from modules.config_loader import load_config
+from modules.document_store import DocumentStore
+from modules.embedding_files import EMBEDDINGS_FILE, HASHES_FILE, IDS_FILE
+from modules.vector_store import INDEX_TYPES, VectorStore
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.yml")
+DIMENSION = 32
+COUNT = 1000
+
+
+def make_config(root, index_type, mmap=True):
+    config = copy.deepcopy(load_config(CONFIG_PATH))
+    config["knowledgebase"] = dict(config["knowledgebase"], output_dir=os.path.join(root, "knowledgebase"),
+                                   chunks_dir=os.path.join(root, "knowledgebase", "chunks"))
+    config["embeddings"] = dict(config["embeddings"], output_dir=os.path.join(root, "embeddings"))
+    config["vector_store"] = dict(config["vector_store"], output_dir=os.path.join(root, "vectorstore"), mmap=mmap,
+                                  index=dict(config["vector_store"]["index"], type=index_type, pq_m=8, pq_nbits=4))
+    return config
+
+
+def write_embeddings(config):
+    vectors = np.random.default_rng(0).standard_normal((COUNT, DIMENSION)).astype(np.float32)
+    ids = np.array([f"chunk-{i}" for i in range(COUNT)])
+    embedding_dir = config["embeddings"]["output_dir"]
+    os.makedirs(embedding_dir)
+    np.save(os.path.join(embedding_dir, EMBEDDINGS_FILE), vectors)
+    np.save(os.path.join(embedding_dir, IDS_FILE), ids)
+    np.save(os.path.join(embedding_dir, HASHES_FILE), np.array([f"hash-{i}" for i in range(COUNT)]))
+    with DocumentStore.chunks_from_config(config).writer() as writer:
+        for i, doc_id in enumerate(ids.tolist()):
+            writer.add({"id": doc_id, "content": f"chunk number {i} about plan{i}"})
+    return ids, vectors
+
+
+@pytest.mark.parametrize("mmap", [True, False], ids=["mmap", "in-memory"])
+@pytest.mark.parametrize("index_type", sorted(INDEX_TYPES))
+def test_read_only_load(tmp_path, index_type, mmap):
+    config = make_config(str(tmp_path), index_type, mmap)
+    ids, vectors = write_embeddings(config)
+    VectorStore(config).build()
+
+    store = VectorStore(config, read_only=True)
+    store.load()
+
+    assert store.version == store.current_version()
+    results = store.search_batch(vectors[:5], 10)
+    for doc_id, row in zip(ids[:5].tolist(), results):
+        assert doc_id in [result_id for result_id, _ in row]
+    assert store.search_lexical("plan7", 1)[0][0] == "chunk-7"
+    with pytest.raises(PermissionError):
+        store.apply_delta()
+
+
+def test_read_only_store_never_builds(tmp_path):
+    config = make_config(str(tmp_path), "flat")
+    write_embeddings(config)
+    store = VectorStore(config, read_only=True)
+    with pytest.raises(FileNotFoundError):
+        store.ensure_loaded()
+    assert store.current_version() is None
+    assert os.listdir(store.versions_dir) == []
+
+    version = VectorStore(config).build()
+    store.ensure_loaded()
+    assert store.version == version
+
+
+def change_embeddings(config, ids, vectors):
+    """Replace the first vector and drop the last chunk, as a re-crawl would."""
+    embedding_dir = config["embeddings"]["output_dir"]
+    vectors = vectors[:-1].copy()
+    vectors[0] = -vectors[0]
+    np.save(os.path.join(embedding_dir, EMBEDDINGS_FILE), vectors)
+    np.save(os.path.join(embedding_dir, IDS_FILE), ids[:-1])
+    hashes = ["hash-0-changed"] + [f"hash-{i}" for i in range(1, COUNT - 1)]
+    np.save(os.path.join(embedding_dir, HASHES_FILE), np.array(hashes))
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "ivf", "ivfsq8", "ivfpq"])
+def test_apply_delta_returns_published_version(tmp_path, index_type):
+    # hnsw cannot remove vectors, so its update falls back to a full build
+    config = make_config(str(tmp_path), index_type)
+    ids, vectors = write_embeddings(config)
+    store = VectorStore(config)
+    first = store.apply_delta()
+    assert first is not None and first == store.current_version()
+    assert store.apply_delta() == first
+
+    change_embeddings(config, ids, vectors)
+    second = store.apply_delta()
+    assert second is not None and second != first
+    assert second == store.current_version()
+    assert len(store.labels) == COUNT - 1
+    assert store.labels["chunk-0"][1] == "hash-0-changed"
+    # Exact queries still find their own chunk after the removal
+    results = store.search_batch(vectors[100:105], 1)
+    assert [row[0][0] for row in results] == [f"chunk-{i}" for i in range(100, 105)]
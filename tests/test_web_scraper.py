@@ -0,0 +1,93 @@
+import copy
+import os
+
+from benchmarks.corpus import SyntheticCorpus
+from benchmarks.local_site import LocalSite, add_sitemaps
+from modules.config_loader import load_config
+from modules.web_scraper import WebScraper
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.yml")
+
+
+def make_config(root, site, paths):
+    config = copy.deepcopy(load_config(CONFIG_PATH))
+    config["scraper"] = {
+        "base_domain": site.base_url,
+        "pages": {"urls": [site.base_url + path for path in paths], "max_pages": 100},
+        "articles": {"urls": [], "max_articles": 0},
+        "output_dir": os.path.join(root, "raw"),
+        "manifest_path": os.path.join(root, "crawl_manifest.json"),
+        "delta_path": os.path.join(root, "crawl_delta.json"),
+        "concurrency": {"workers": 2, "rate_limit_per_host": 0},
+    }
+    return config
+
+
+def saved_texts(config):
+    output_dir = config["scraper"]["output_dir"]
+    texts = {}
+    for filename in sorted(os.listdir(output_dir)):
+        with open(os.path.join(output_dir, filename), "r", encoding="utf-8") as f:
+            texts[filename] = f.read()
+    return texts
+
+
+def test_duplicate_is_saved_once_its_original_changes(tmp_path):
+    corpus = SyntheticCorpus(2)
+    pages = {"/a": corpus.html(0), "/b": corpus.html(0)}
+    with LocalSite(pages) as site:
+        config = make_config(str(tmp_path), site, ["/a", "/b"])
+        WebScraper(config).scrape()
+        first = saved_texts(config)
+        assert list(first) == ["page__a.txt"]
+
+        pages["/a"] = corpus.html(1)
+        delta = WebScraper(config).scrape()
+        second = saved_texts(config)
+
+    # /b still serves the old content of /a, which is no longer saved anywhere else
+    assert sorted(second) == ["page__a.txt", "page__b.txt"]
+    assert second["page__b.txt"] == first["page__a.txt"]
+    assert second["page__a.txt"] != first["page__a.txt"]
+    assert delta["changed"] == ["page__a.txt", "page__b.txt"]
+
+
+def test_unchanged_duplicate_stays_skipped(tmp_path):
+    corpus = SyntheticCorpus(1)
+    pages = {"/a": corpus.html(0), "/b": corpus.html(0)}
+    with LocalSite(pages) as site:
+        config = make_config(str(tmp_path), site, ["/a", "/b"])
+        WebScraper(config).scrape()
+        delta = WebScraper(config).scrape()
+
+    assert list(saved_texts(config)) == ["page__a.txt"]
+    assert delta == {"changed": [], "removed": []}
+
+
+def test_failed_sitemap_does_not_remove_pages(tmp_path):
+    corpus = SyntheticCorpus(3)
+    pages = {"/a": corpus.html(0), "/b": corpus.html(1)}
+    with LocalSite(pages) as site:
+        config = make_config(str(tmp_path), site, [])
+        config["scraper"]["pages"] = {"sitemaps": [add_sitemaps(site, compress=False)], "max_pages": 100}
+        pages["/articles/c"] = corpus.html(2)
+        config["scraper"]["articles"] = {"urls": [site.base_url + "/articles/c"], "max_articles": 100}
+        WebScraper(config).scrape()
+        saved = saved_texts(config)
+        assert sorted(saved) == ["article__articles_c.txt", "page__a.txt", "page__b.txt"]
+
+        # The sitemap index is briefly unavailable: no page urls are discovered
+        index = pages.pop("/sitemap.xml")
+        scraper = WebScraper(config)
+        delta = scraper.scrape()
+        assert [url for url, _ in scraper.sitemap_reader.failures] == [site.base_url + "/sitemap.xml"]
+        assert delta["removed"] == []
+        assert saved_texts(config) == saved
+
+        # Once it is back, pages that really left the sitemap are still removed
+        pages["/sitemap.xml"] = index
+        del pages["/b"]
+        pages["/sitemap-0.xml"] = pages["/sitemap-0.xml"].replace(f"<url><loc>{site.base_url}/b</loc></url>".encode(), b"")
+        delta = WebScraper(config).scrape()
+    assert delta["removed"] == ["page__b.txt"]
+    assert sorted(saved_texts(config)) == ["article__articles_c.txt", "page__a.txt"]